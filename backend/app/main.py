@@ -9,6 +9,7 @@ from contextlib import asynccontextmanager
 from app import models, db
 from .routes import backtest, exchanges, profile, calendar, upload, social, analytics, trades, coach, blofin_sync, binance_sync, bybit_sync, hyperliquid_sync, leverage_settings, journal, invite
 from .services.sync_scheduler import start_scheduler, stop_scheduler
+from .services.supabase_client import SupabaseClient
 import logging
 
 
@@ -56,6 +57,7 @@ async def lifespan(app: FastAPI):
         logger.info("Scheduler stopped successfully")
     except Exception as e:
         logger.error(f"Error stopping scheduler: {e}")
+    await SupabaseClient.aclose_all()
 
 app = FastAPI(
     title="Walleto Backtest API",
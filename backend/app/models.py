@@ -1,9 +1,23 @@
 # app/models.py
-from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, ForeignKey, Text, func
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, ForeignKey, Index, Text, column, func
 from .db import Base
+import os
+import time
 import uuid
 
 
+def new_trade_id() -> str:
+    """
+    Time-ordered UUID (version 7 layout) for trade primary keys.
+    Monotonic prefixes keep inserts at the right edge of the trades PK index
+    instead of splitting random pages like uuid4 does.
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = value & ~(0xF << 76) | 0x7 << 76  # version 7
+    value = value & ~(0x3 << 62) | 0x2 << 62  # RFC 4122 variant
+    return str(uuid.UUID(int=value))
+
+
 class Candle(Base):
     __tablename__ = "candles"
 
@@ -61,7 +75,7 @@ class ExchangeConnection(Base):
     api_secret_encrypted = Column(String, nullable=False)
     api_passphrase_encrypted = Column(String, nullable=True)
     last_sync_time = Column(DateTime(timezone=True), nullable=True)
-    last_sync_status = Column(String, nullable=True, default="pending")  # pending, in_progress, success, failed
+    last_sync_status = Column(String, nullable=True, default="pending")  # pending, in_progress, success, partial, failed
     last_error = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
@@ -107,7 +121,7 @@ class CalendarEvent(Base):
 class Trade(Base):
     __tablename__ = "trades"
 
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(String, primary_key=True, default=new_trade_id)
     user_id = Column(String, index=True, nullable=False)
     symbol = Column(String, nullable=False)
     side = Column(String, nullable=False)
@@ -123,6 +137,18 @@ class Trade(Base):
     pnl_usd = Column(Float, nullable=True)  # PnL in USD
     pnl_pct = Column(Float, nullable=True)  # PnL percentage from exchange sync
 
+    __table_args__ = (
+        # Matches get_user_trades' keyset order (date DESC NULLS LAST, id DESC),
+        # so a newest-first page is an ordered index scan that stops at LIMIT.
+        # SQLite can't index NULLS LAST, so the local fallback database skips it
+        Index(
+            "ix_trades_user_date_id",
+            "user_id",
+            column("date").desc().nulls_last(),
+            column("id").desc(),
+        ).ddl_if(dialect="postgresql"),
+    )
+
 
 class Post(Base):
     __tablename__ = "posts"
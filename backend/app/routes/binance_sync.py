@@ -13,12 +13,13 @@ from supabase import create_client, Client
 
 from app.services.binance_client import (
     BinanceClient,
-    aggregate_binance_trades,
-    calculate_binance_trade_fields
+    aggregate_binance_symbol_trades,
+    calculate_binance_trade_fields_batch
 )
 from app.db import get_db
 from app.models import ExchangeConnection
 from app.services.encryption import encrypt_secret, decrypt_secret
+from app.services.coach_service import CoachService
 
 router = APIRouter(prefix="/api/binance", tags=["binance"])
 
@@ -85,9 +86,8 @@ def prepare_binance_trades_for_supabase(trades: list, user_id: str = None, defau
     """
     prepared = []
 
-    for trade in trades:
-        # Calculate trade fields
-        calculated = calculate_binance_trade_fields(trade)
+    # Calculate trade fields (timestamps are formatted for the whole list at once)
+    for calculated in calculate_binance_trade_fields_batch(trades):
         if not calculated:
             continue
 
@@ -192,30 +192,36 @@ async def sync_binance_trades(request: BinanceSyncRequest, db: Session = Depends
 
         # Validate credentials and create client
         print("Fetching trades from Binance Futures...")
-        client = BinanceClient(
+        with BinanceClient(
             api_key=request.api_key,
             api_secret=request.api_secret
-        )
-
-        # Fetch current leverage settings (NOTE: historical leverage NOT available)
-        print("Fetching current leverage settings from Binance...")
-        leverage_map = client.fetch_leverage_map()
-
-        # Fetch all trades
-        raw_trades = client.fetch_trade_history(
-            start_time=last_sync_timestamp
-        )
+        ) as client:
+            # Fetch current leverage settings (NOTE: historical leverage NOT available)
+            print("Fetching current leverage settings from Binance...")
+            leverage_map = client.fetch_leverage_map()
+
+            # Aggregate individual fills into positions one symbol at a time,
+            # as each symbol's fetch completes, so the raw fills of every
+            # symbol are never held at once
+            raw_trades_count = 0
+            aggregated_trades = []
+            async for _, symbol_trades in client.iter_trade_history_async(
+                start_time=last_sync_timestamp
+            ):
+                raw_trades_count += len(symbol_trades)
+                aggregated_trades.extend(
+                    aggregate_binance_symbol_trades(
+                        symbol_trades, leverage_map=leverage_map, assume_sorted=True
+                    )
+                )
 
-        if not raw_trades:
+        if not raw_trades_count:
             return BinanceSyncResponse(
                 success=False,
                 message="No trades found. Check your credentials and account history. Note: Binance only provides 6 months of trade history."
             )
 
-        print(f"Fetched {len(raw_trades)} raw trades from Binance")
-
-        # Aggregate individual trades into positions
-        aggregated_trades = aggregate_binance_trades(raw_trades, leverage_map=leverage_map)
+        print(f"Fetched {raw_trades_count} raw trades from Binance")
         print(f"Aggregated into {len(aggregated_trades)} complete positions")
 
         # Fetch default leverage settings for this user
@@ -264,6 +270,10 @@ async def sync_binance_trades(request: BinanceSyncRequest, db: Session = Depends
             except Exception as conn_err:
                 print(f"Warning: Failed to save connection to Supabase: {conn_err}")
 
+        # The client inserts these trades next; cached coach context predates them
+        if request.user_id:
+            CoachService.invalidate_user_trades(request.user_id)
+
         return BinanceSyncResponse(
             success=True,
             message=f"Successfully fetched and processed {len(prepared_trades)} trades",
@@ -330,9 +340,9 @@ async def resync_binance_trades(connection_id: str, db: Session = Depends(get_db
 async def test_binance_credentials(api_key: str, api_secret: str):
     """Test if Binance credentials are valid"""
     try:
-        client = BinanceClient(api_key, api_secret)
-        # Try to get account info to validate credentials
-        account = client.get_account_info()
+        with BinanceClient(api_key, api_secret) as client:
+            # Try to get account info to validate credentials
+            account = client.get_account_info()
 
         return {
             "success": True,
@@ -12,10 +12,11 @@ import uuid
 from sqlalchemy.orm import Session
 from supabase import create_client, Client
 
-from app.services.blofin_client import BlofinClient, calculate_trade_fields, aggregate_fills_by_order
+from app.services.blofin_client import BlofinClient, calculate_trade_fields_batch, aggregate_fills_by_order
 from app.db import get_db
 from app.models import ExchangeConnection
 from app.services.encryption import encrypt_secret, decrypt_secret
+from app.services.coach_service import CoachService
 
 router = APIRouter(prefix="/api/blofin", tags=["blofin"])
 
@@ -390,25 +391,24 @@ async def sync_blofin_trades(request: BlofinSyncRequest, db: Session = Depends(g
 
         # Validate credentials and fetch trades
         print(f"Fetching trades from Blofin...")
-        client = BlofinClient(
+        with BlofinClient(
             api_key=request.api_key,
             api_secret=request.api_secret,
             passphrase=request.api_passphrase
-        )
-
-        # Fetch contract sizes for all instruments (needed for size conversion)
-        print("📏 Fetching contract sizes from Blofin...")
-        contract_sizes = client.fetch_contract_sizes()
-
-        # Fetch current leverage settings for all instruments
-        print("📊 Fetching leverage settings from account positions...")
-        leverage_map = client.fetch_leverage_map()
-
-        # Fetch trades (incremental if we have a last sync time)
-        raw_fills = client.fetch_trade_history(
-            page_limit=100,
-            begin=last_sync_timestamp  # Only fetch trades since last sync
-        )
+        ) as client:
+            # Fetch contract sizes for all instruments (needed for size conversion)
+            print("📏 Fetching contract sizes from Blofin...")
+            contract_sizes = client.fetch_contract_sizes()
+
+            # Fetch current leverage settings for all instruments
+            print("📊 Fetching leverage settings from account positions...")
+            leverage_map = client.fetch_leverage_map()
+
+            # Fetch trades (incremental if we have a last sync time)
+            raw_fills = await client.fetch_trade_history_async(
+                page_limit=100,
+                begin=last_sync_timestamp  # Only fetch trades since last sync
+            )
 
         if not raw_fills:
             return BlofinSyncResponse(
@@ -422,19 +422,14 @@ async def sync_blofin_trades(request: BlofinSyncRequest, db: Session = Depends(g
         aggregated_fills = aggregate_fills_by_order(raw_fills, leverage_map=leverage_map)
         print(f"✅ Aggregated into {len(aggregated_fills)} complete trades")
 
-        # Calculate fields for all aggregated trades
+        # Calculate fields for all aggregated trades in one vectorized pass
         calculated_trades = []
-        for fill in aggregated_fills:
-            try:
-                trade = calculate_trade_fields(fill)
-                # Skip invalid trades (returns None if entry price == 0)
-                if trade is not None:
-                    calculated_trades.append(trade)
-                else:
-                    print(f"⏭️ Skipped invalid trade {fill.get('tradeId')} (entry price == 0)")
-            except Exception as e:
-                print(f"⚠️ Failed to process trade {fill.get('tradeId')}: {e}")
-                continue
+        for fill, trade in zip(aggregated_fills, calculate_trade_fields_batch(aggregated_fills)):
+            # Skip invalid trades (None if entry price == 0 or the fill is malformed)
+            if trade is not None:
+                calculated_trades.append(trade)
+            else:
+                print(f"⏭️ Skipped invalid trade {fill.get('tradeId')}")
 
         print(f"✅ Successfully calculated fields for {len(calculated_trades)} trades")
 
@@ -512,6 +507,10 @@ async def sync_blofin_trades(request: BlofinSyncRequest, db: Session = Depends(g
             except Exception as conn_err:
                 print(f"⚠️ Failed to save connection to Supabase: {conn_err}")
 
+        # The client inserts these trades next; cached coach context predates them
+        if request.user_id:
+            CoachService.invalidate_user_trades(request.user_id)
+
         return BlofinSyncResponse(
             success=True,
             message=f"Successfully fetched and processed {len(prepared_trades)} trades",
@@ -587,8 +586,8 @@ async def resync_blofin_trades(connection_id: str, db: Session = Depends(get_db)
 async def test_blofin_credentials(api_key: str, api_secret: str, api_passphrase: str):
     """Test if Blofin credentials are valid by attempting to fetch one trade"""
     try:
-        client = BlofinClient(api_key, api_secret, api_passphrase)
-        trades = client.fetch_trade_history(page_limit=1)
+        with BlofinClient(api_key, api_secret, api_passphrase) as client:
+            trades = await client.fetch_trade_history_async(page_limit=1)
 
         if trades:
             return {
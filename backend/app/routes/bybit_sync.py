@@ -11,13 +11,18 @@ import uuid
 from sqlalchemy.orm import Session
 from supabase import create_client, Client
 
-from app.services.bybit_client import BybitClient, calculate_bybit_trade_fields
+from app.services.bybit_client import BybitClient, calculate_bybit_trade_fields_batch
 from app.db import get_db
 from app.models import ExchangeConnection
 from app.services.encryption import encrypt_secret, decrypt_secret
+from app.services.coach_service import CoachService
 
 router = APIRouter(prefix="/api/bybit", tags=["bybit"])
 
+# Closed PnL records are prepared in batches of this size while later
+# windows are still downloading
+PREPARE_BATCH_SIZE = 1000
+
 # Initialize Supabase client
 supabase_url = os.environ.get("SUPABASE_URL")
 supabase_key = os.environ.get("SUPABASE_SERVICE_KEY") or os.environ.get("SUPABASE_KEY")
@@ -70,9 +75,8 @@ def prepare_bybit_trades_for_supabase(trades: list, user_id: str = None) -> list
     """
     prepared = []
 
-    for record in trades:
-        # Calculate trade fields
-        calculated = calculate_bybit_trade_fields(record)
+    # Calculate trade fields for all records in one vectorized pass
+    for calculated in calculate_bybit_trade_fields_batch(trades):
         if not calculated:
             continue
 
@@ -167,26 +171,62 @@ async def sync_bybit_trades(request: BybitSyncRequest, db: Session = Depends(get
 
         # Validate credentials and create client
         print("Fetching closed PnL from Bybit...")
-        client = BybitClient(
+        prepared_trades = []
+        raw_count = 0
+        with BybitClient(
             api_key=request.api_key,
             api_secret=request.api_secret
-        )
+        ) as client:
+            # Stream closed PnL records and prepare them for Supabase batch by
+            # batch, so raw records are dropped as soon as they are mapped
+            batch = []
+            async for record in client.iter_closed_pnl_async(start_time=last_sync_timestamp):
+                batch.append(record)
+                if len(batch) >= PREPARE_BATCH_SIZE:
+                    prepared_trades.extend(prepare_bybit_trades_for_supabase(batch, request.user_id))
+                    raw_count += len(batch)
+                    batch = []
+            if batch:
+                prepared_trades.extend(prepare_bybit_trades_for_supabase(batch, request.user_id))
+                raw_count += len(batch)
+
+        # Records in failed windows were never fetched, so the next
+        # incremental sync must start no later than the oldest of them
+        sync_time = datetime.utcnow()
+        sync_status = "success"
+        sync_error = None
+        if client.failed_windows:
+            print(f"Warning: {len(client.failed_windows)} Bybit closed PnL windows failed and were skipped: {client.failed_windows}")
+            oldest_failed_start = min(start for start, _ in client.failed_windows)
+            sync_time = min(sync_time, datetime.utcfromtimestamp(oldest_failed_start / 1000))
+            sync_status = "partial"
+            sync_error = (
+                f"{len(client.failed_windows)} closed PnL windows could not be fetched; "
+                "they are fetched again on the next sync"
+            )
 
-        # Fetch all closed PnL records
-        raw_records = client.fetch_closed_pnl(
-            start_time=last_sync_timestamp
-        )
+        if connection:
+            if raw_count:
+                connection.last_sync_time = sync_time
+            elif client.failed_windows:
+                sync_status = "failed"
+            connection.last_sync_status = sync_status
+            connection.last_error = sync_error
+            db.commit()
 
-        if not raw_records:
+        if not raw_count and client.failed_windows:
             return BybitSyncResponse(
                 success=False,
-                message="No closed PnL records found. Check your credentials and account history. Note: Bybit provides up to 2 years of history."
+                message="Could not fetch closed PnL from Bybit. Please try again."
             )
 
-        print(f"Fetched {len(raw_records)} closed PnL records from Bybit")
+        if not raw_count:
+            return BybitSyncResponse(
+                success=False,
+                message="No closed PnL records found. Check your credentials and account history. Note: Bybit provides up to 2 years of history."
+            )
 
-        # Prepare trades for Supabase
-        prepared_trades = prepare_bybit_trades_for_supabase(raw_records, request.user_id)
+        print(f"Fetched {raw_count} closed PnL records from Bybit")
 
         print(f"Prepared {len(prepared_trades)} trades for Supabase")
         if prepared_trades:
@@ -195,15 +235,14 @@ async def sync_bybit_trades(request: BybitSyncRequest, db: Session = Depends(get
         # Save or update connection if requested
         if request.save_connection and request.user_id and supabase:
             try:
-                now_iso = datetime.utcnow().isoformat()
                 existing = supabase.table('exchange_connections').select('id').eq('user_id', request.user_id).eq('exchange_name', 'bybit').execute()
 
                 if existing.data and len(existing.data) > 0:
                     conn_id = existing.data[0]['id']
                     supabase.table('exchange_connections').update({
-                        'last_sync_time': now_iso,
-                        'last_sync_status': 'success',
-                        'last_error': None
+                        'last_sync_time': sync_time.isoformat(),
+                        'last_sync_status': sync_status,
+                        'last_error': sync_error
                     }).eq('id', conn_id).execute()
                     print(f"Updated Supabase connection {conn_id}")
                 else:
@@ -215,16 +254,22 @@ async def sync_bybit_trades(request: BybitSyncRequest, db: Session = Depends(get
                         'api_key_encrypted': encrypt_secret(request.api_key),
                         'api_secret_encrypted': encrypt_secret(request.api_secret),
                         'api_key_last_4': request.api_key[-4:] if len(request.api_key) >= 4 else '****',
-                        'last_sync_time': now_iso,
-                        'last_sync_status': 'success'
+                        'last_sync_time': sync_time.isoformat(),
+                        'last_sync_status': sync_status,
+                        'last_error': sync_error
                     }).execute()
                     print(f"Created new Supabase connection {connection_id}")
             except Exception as conn_err:
                 print(f"Warning: Failed to save connection to Supabase: {conn_err}")
 
+        # The client inserts these trades next; cached coach context predates them
+        if request.user_id:
+            CoachService.invalidate_user_trades(request.user_id)
+
         return BybitSyncResponse(
             success=True,
-            message=f"Successfully fetched and processed {len(prepared_trades)} trades",
+            message=f"Successfully fetched and processed {len(prepared_trades)} trades"
+            + (f" ({sync_error})" if sync_error else ""),
             trades_count=len(prepared_trades),
             trades=prepared_trades
         )
@@ -288,9 +333,9 @@ async def resync_bybit_trades(connection_id: str, db: Session = Depends(get_db))
 async def test_bybit_credentials(api_key: str, api_secret: str):
     """Test if Bybit credentials are valid"""
     try:
-        client = BybitClient(api_key, api_secret)
-        # Try to get position info to validate credentials
-        positions = client.get_position_info()
+        with BybitClient(api_key, api_secret) as client:
+            # Try to get position info to validate credentials
+            positions = client.get_position_info()
 
         return {
             "success": True,
@@ -4,7 +4,9 @@ Enhanced for the AI Trading Coach with proactive features.
 """
 
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+import orjson
 from pydantic import BaseModel, validator
 from typing import Optional, List
 from datetime import datetime, timedelta
@@ -323,6 +325,73 @@ async def send_message(
         raise HTTPException(status_code=500, detail=f"Failed to send message: {str(e)}")
 
 
+def _sse_event(payload: dict) -> bytes:
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+
+@router.post("/conversations/{conversation_id}/messages/stream")
+async def send_message_stream(
+    user_id: str,
+    conversation_id: str,
+    req: SendMessageRequest,
+    db: Session = Depends(get_db),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+):
+    """
+    Send a message in a conversation and stream the coach response.
+
+    Server-sent events: {"type": "delta", "text": ...} per chunk, then
+    {"type": "done", ...} with the same fields as the send_message response,
+    or {"type": "error", "detail": ...} if generation fails midway.
+
+    Args:
+        user_id: User ID (query parameter)
+        conversation_id: Conversation ID (path parameter)
+        req: Request with message content
+    """
+    verify_user_access(user_id, current_user)
+
+    metadata: dict = {}
+    chunks = coach_service.send_message_stream(
+        user_id, conversation_id, req.content, db, metadata
+    )
+
+    # Wait for the first chunk before responding, so conversation lookup and
+    # Claude failures still map to status codes
+    try:
+        first_chunk = await anext(chunks, None)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to send message: {str(e)}")
+
+    async def events():
+        try:
+            if first_chunk is not None:
+                yield _sse_event({"type": "delta", "text": first_chunk})
+            async for chunk in chunks:
+                yield _sse_event({"type": "delta", "text": chunk})
+            yield _sse_event({
+                "type": "done",
+                "id": metadata["message_id"],
+                "role": "assistant",
+                "tokens_used": metadata["tokens_used"],
+                "created_at": metadata.get("created_at", datetime.utcnow().isoformat()),
+            })
+        except Exception as e:
+            yield _sse_event({"type": "error", "detail": str(e)})
+        finally:
+            await chunks.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.delete("/conversations/{conversation_id}", response_model=DeleteConversationResponse)
 async def delete_conversation(
     user_id: str,
@@ -8,9 +8,10 @@ from datetime import datetime
 from supabase import create_client, Client
 
 from app.db import get_db
-from app.models import ExchangeConnection, Trade
+from app.models import ExchangeConnection, Trade, new_trade_id
 from app.services.encryption import encrypt_secret, decrypt_secret
 from app.services.exchange_service import ExchangeService
+from app.services.coach_service import CoachService
 from app.auth import get_current_user, verify_user_access, AuthenticatedUser
 
 router = APIRouter(prefix="/api/exchanges", tags=["exchanges"])
@@ -311,7 +312,7 @@ async def run_sync_job(connection_id: str, exchange_name: str, api_key: str, api
                     continue
 
                 new_trade = Trade(
-                    id=str(uuid.uuid4()),
+                    id=new_trade_id(),
                     user_id=user_id,
                     date=trade_data.get('date'),
                     symbol=trade_data.get('symbol'),
@@ -340,6 +341,7 @@ async def run_sync_job(connection_id: str, exchange_name: str, api_key: str, api
         # Commit all trades
         if trades_imported > 0:
             db.commit()
+            CoachService.invalidate_user_trades(user_id)
             print(f"Successfully imported {trades_imported} trades")
 
         # Update sync status to success
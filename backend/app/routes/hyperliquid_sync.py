@@ -18,6 +18,7 @@ from app.services.hyperliquid_client import (
 )
 from app.db import get_db
 from app.models import ExchangeConnection
+from app.services.coach_service import CoachService
 
 router = APIRouter(prefix="/api/hyperliquid", tags=["hyperliquid"])
 
@@ -220,6 +221,10 @@ async def sync_hyperliquid_trades(request: HyperliquidSyncRequest, db: Session =
             except Exception as conn_err:
                 print(f"Warning: Failed to save connection to Supabase: {conn_err}")
 
+        # The client inserts these trades next; cached coach context predates them
+        if request.user_id:
+            CoachService.invalidate_user_trades(request.user_id)
+
         return HyperliquidSyncResponse(
             success=True,
             message=f"Successfully fetched and processed {len(prepared_trades)} trades from {len(raw_fills)} fills",
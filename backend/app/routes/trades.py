@@ -1,73 +1,66 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import and_, or_, select, tuple_
 from sqlalchemy.orm import Session
-from pydantic import BaseModel, validator
-from typing import Optional
+from pydantic import BaseModel, Field, StringConstraints, field_validator
+from typing import Annotated, Literal, Optional
 from datetime import datetime
-import uuid
 import os
 import httpx
-import re
+import orjson
+import logging
 
 from app.db import get_db
-from app.models import Trade
+from app.models import Trade, new_trade_id
 from app.auth import get_current_user, verify_user_access, AuthenticatedUser
+from app.services.coach_service import CoachService
+
+logger = logging.getLogger(__name__)
+
+# Supabase REST settings (read once; .env is loaded before routes are imported)
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_ANON_KEY") or os.getenv("SUPABASE_KEY")
+SUPABASE_HEADERS = {
+    "apikey": SUPABASE_KEY,
+    "Authorization": f"Bearer {SUPABASE_KEY}",
+    "Content-Type": "application/json",
+    "Prefer": "resolution=merge-duplicates",
+} if SUPABASE_URL and SUPABASE_KEY else None
 
 router = APIRouter(prefix="/api/trades", tags=["trades"])
 
+# Field constraints are enforced by pydantic-core; validators only normalize.
+# Symbol: only allow alphanumeric, dash, underscore, slash
+Symbol = Annotated[str, StringConstraints(pattern=r'^[A-Za-z0-9/_-]+$', min_length=1, max_length=50)]
+NonNegativeFloat = Annotated[float, Field(ge=0)]
+
+
 class ManualTradeCreate(BaseModel):
     date: str  # ISO format string
-    symbol: str
+    symbol: Symbol
     side: str
-    entry: float
-    exit: float
-    size: float
-    leverage: float
-    fees: float
+    entry: NonNegativeFloat
+    exit: NonNegativeFloat
+    size: NonNegativeFloat
+    leverage: Annotated[float, Field(ge=1, le=200)]
+    fees: NonNegativeFloat
     pnl: float
     pnl_percent: float
     setup_name: Optional[str] = None
-    notes: Optional[str] = None
-    exchange: Optional[str] = "Manual"
-
-    @validator('symbol')
-    def validate_symbol(cls, v):
-        if not v or len(v) > 50:
-            raise ValueError('Symbol must be 1-50 characters')
-        # Only allow alphanumeric, dash, underscore, slash
-        if not re.match(r'^[A-Za-z0-9/_-]+$', v):
-            raise ValueError('Symbol contains invalid characters')
+    notes: Optional[Annotated[str, StringConstraints(max_length=5000)]] = None
+    exchange: Optional[Annotated[str, StringConstraints(max_length=50)]] = "Manual"
+
+    @field_validator('symbol', mode='after')
+    @classmethod
+    def normalize_symbol(cls, v):
         return v.upper()
 
-    @validator('side')
+    @field_validator('side')
+    @classmethod
     def validate_side(cls, v):
         if v.lower() not in ['long', 'short', 'buy', 'sell']:
             raise ValueError('Side must be long, short, buy, or sell')
         return v.lower()
 
-    @validator('entry', 'exit', 'size', 'fees')
-    def validate_positive(cls, v):
-        if v < 0:
-            raise ValueError('Value must be non-negative')
-        return v
-
-    @validator('leverage')
-    def validate_leverage(cls, v):
-        if v < 1 or v > 200:
-            raise ValueError('Leverage must be between 1 and 200')
-        return v
-
-    @validator('notes')
-    def validate_notes(cls, v):
-        if v and len(v) > 5000:
-            raise ValueError('Notes must be under 5000 characters')
-        return v
-
-    @validator('exchange')
-    def validate_exchange(cls, v):
-        if v and len(v) > 50:
-            raise ValueError('Exchange name must be under 50 characters')
-        return v
-
 
 @router.post("/manual")
 def create_manual_trade(
@@ -86,8 +79,9 @@ def create_manual_trade(
         # Use authenticated user's ID
         user_id = current_user.id
 
+        trade_id = new_trade_id()
         new_trade = Trade(
-            id=str(uuid.uuid4()),
+            id=trade_id,
             user_id=user_id,
             date=trade_date,
             symbol=trade.symbol,
@@ -106,26 +100,84 @@ def create_manual_trade(
 
         db.add(new_trade)
         db.commit()
-        db.refresh(new_trade)
+        CoachService.invalidate_user_trades(user_id)
 
-        return {"status": "success", "id": new_trade.id}
+        # Use the local id: the instance is expired after commit and
+        # touching its attributes would reload the row
+        return {"status": "success", "id": trade_id}
 
     except Exception as e:
-        print(f"Error creating trade: {e}")
+        logger.error("Error creating trade: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/{user_id}")
+def _encode_trade_cursor(trade: dict) -> str:
+    """Build an opaque pagination cursor from a trade row's (date, id) sort key"""
+    date_part = trade["date"].isoformat() if trade["date"] else ""
+    return f"{date_part}|{trade['id']}"
+
+
+def _decode_trade_cursor(cursor: str) -> tuple[Optional[datetime], str]:
+    """Parse a cursor produced by _encode_trade_cursor"""
+    try:
+        date_part, trade_id = cursor.split("|", 1)
+        return (datetime.fromisoformat(date_part) if date_part else None), trade_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/{user_id}", response_model=None)
 def get_user_trades(
     user_id: str,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=500),
+    order: Literal["asc", "desc"] = Query("desc", description="Sort by trade date"),
     db: Session = Depends(get_db),
     current_user: AuthenticatedUser = Depends(get_current_user)
 ):
-    """Get all trades for a user"""
+    """Get a page of trades for a user, ordered by date (newest first by default)"""
     # Verify the authenticated user can only access their own data
     verify_user_access(user_id, current_user)
 
-    trades = db.query(Trade).filter(Trade.user_id == user_id).all()
-    return trades
+    # Plain column rows: no ORM hydration for data that only gets serialized
+    query = select(Trade.__table__).where(Trade.user_id == user_id)
+    descending = order == "desc"
+    if cursor:
+        # Keyset pagination on (date, id) - no OFFSET scan-and-discard
+        cursor_date, cursor_id = _decode_trade_cursor(cursor)
+        sort_key = tuple_(Trade.date, Trade.id)
+        if cursor_date is None:
+            # Undated trades sort last, so the cursor is already among them
+            past_id = Trade.id < cursor_id if descending else Trade.id > cursor_id
+            query = query.where(and_(Trade.date.is_(None), past_id))
+        else:
+            past_key = (
+                sort_key < (cursor_date, cursor_id) if descending
+                else sort_key > (cursor_date, cursor_id)
+            )
+            query = query.where(or_(past_key, Trade.date.is_(None)))
+
+    # ORDER BY + LIMIT in SQL; ix_trades_user_date_id has exactly the
+    # descending order, so the default newest-first listing reads rows in
+    # index order and stops after the page (ascending pages still sort)
+    if descending:
+        query = query.order_by(Trade.date.desc().nulls_last(), Trade.id.desc())
+    else:
+        query = query.order_by(Trade.date.asc().nulls_last(), Trade.id.asc())
+
+    # Fetch one extra row to know whether another page exists
+    query = query.limit(limit + 1)
+    trades = [dict(row) for row in db.execute(query).mappings()]
+
+    next_cursor = None
+    if len(trades) > limit:
+        trades = trades[:limit]
+        next_cursor = _encode_trade_cursor(trades[-1])
+
+    # Pre-serialized response so FastAPI skips jsonable_encoder entirely
+    return Response(
+        content=orjson.dumps({"items": trades, "next_cursor": next_cursor}),
+        media_type="application/json",
+    )
 
 @router.delete("/{user_id}")
 def delete_all_user_trades(
@@ -145,13 +197,58 @@ def delete_all_user_trades(
         # Delete all trades
         db.query(Trade).filter(Trade.user_id == user_id).delete()
         db.commit()
+        CoachService.invalidate_user_trades(user_id)
 
         return {"status": "success", "message": f"Deleted {count} trades", "count": count}
     except Exception as e:
         db.rollback()
-        print(f"Error deleting trades for user {user_id}: {e}")
+        logger.error("Error deleting trades for user %s: %s", user_id, e)
         raise HTTPException(status_code=500, detail=str(e))
 
+# Trades per Supabase POST; upserts merge duplicates, so re-running after a
+# failed batch is safe
+SUPABASE_SYNC_BATCH_SIZE = 500
+
+# Columns read for the Supabase sync, in the order _to_supabase_row unpacks them
+_SUPABASE_SYNC_COLUMNS = (
+    Trade.id,
+    Trade.user_id,
+    Trade.symbol,
+    Trade.side,
+    Trade.size,
+    Trade.date,
+    Trade.pnl_usd,
+    Trade.pnl_pct,
+    Trade.exchange,
+    Trade.notes,
+)
+
+
+def _to_supabase_row(row) -> dict:
+    """Map a trades row to the Supabase trades schema"""
+    trade_id, user_id, symbol, side, size, date, pnl_usd, pnl_pct, exchange, notes = row
+    # Note: Supabase numeric columns have limited precision (12,8), so prices,
+    # leverage and fees are sent as 0 placeholders. Actual prices are large
+    # (e.g., BTC ~100k) so they can't fit in numeric(12,8)
+    return {
+        "id": trade_id,
+        "user_id": user_id,
+        "symbol": symbol,
+        "side": side,
+        "entry_price": 0,
+        "exit_price": 0,
+        "quantity": round(size, 8) if size else 0,
+        "entry_time": date,  # orjson emits ISO 8601 natively
+        "exit_time": date,
+        "leverage": 0,  # Placeholder
+        "fees": 0,      # Placeholder
+        "pnl_usd": round(pnl_usd, 2) if pnl_usd else None,
+        "pnl_percent": round(pnl_pct, 4) if pnl_pct else None,
+        "exchange": exchange,
+        "notes": notes,
+    }
+
+
 @router.post("/{user_id}/sync-to-supabase")
 async def sync_trades_to_supabase(
     user_id: str,
@@ -163,79 +260,44 @@ async def sync_trades_to_supabase(
     verify_user_access(user_id, current_user)
 
     try:
-        print(f"[SYNC-TO-SUPABASE] Starting sync for user {user_id}")
-        # Get all trades from FastAPI DB
-        trades = db.query(Trade).filter(Trade.user_id == user_id).all()
-        print(f"[SYNC-TO-SUPABASE] Found {len(trades)} trades for user {user_id}")
-
-        if not trades:
-            print(f"[SYNC-TO-SUPABASE] No trades to sync for user {user_id}")
+        logger.debug("[SYNC-TO-SUPABASE] Starting sync for user %s", user_id)
+        # Get all trades from FastAPI DB (only the columns Supabase needs)
+        rows = db.execute(
+            select(*_SUPABASE_SYNC_COLUMNS).where(Trade.user_id == user_id)
+        ).all()
+        logger.debug("[SYNC-TO-SUPABASE] Found %d trades for user %s", len(rows), user_id)
+
+        if not rows:
+            logger.info("[SYNC-TO-SUPABASE] No trades to sync for user %s", user_id)
             return {"status": "success", "message": "No trades to sync", "count": 0}
 
-        # Get Supabase credentials from environment
-        supabase_url = os.getenv("SUPABASE_URL")
-        supabase_key = os.getenv("SUPABASE_ANON_KEY") or os.getenv("SUPABASE_KEY")
-        print(f"[SYNC-TO-SUPABASE] Supabase URL: {supabase_url}, Key set: {bool(supabase_key)}")
-
-        if not supabase_url or not supabase_key:
-            print(f"[SYNC-TO-SUPABASE] Warning: Supabase credentials not set, skipping sync")
-            return {"status": "success", "message": "Supabase not configured", "count": len(trades)}
-
-        # Prepare trades for insertion
-        # Map FastAPI trade fields to Supabase schema
-        # Note: Supabase numeric columns have limited precision (12,8), so we use placeholder for large prices
-        trades_to_insert = []
-        for trade in trades:
-            # Use 0 as placeholder for prices that exceed numeric(12,8) limit
-            # Actual prices are large (e.g., BTC ~100k) so they can't fit in numeric(12,8)
-            entry_price = 0 if trade.entry else 0
-            exit_price = 0 if trade.exit else 0
-            quantity = round(trade.size, 8) if trade.size else 0
-
-            trades_to_insert.append({
-                "id": trade.id,
-                "user_id": trade.user_id,
-                "symbol": trade.symbol,
-                "side": trade.side,
-                "entry_price": entry_price,
-                "exit_price": exit_price,
-                "quantity": quantity,
-                "entry_time": trade.date.isoformat() if trade.date else None,
-                "exit_time": trade.date.isoformat() if trade.date else None,
-                "leverage": 0,  # Placeholder
-                "fees": 0,      # Placeholder
-                "pnl_usd": round(trade.pnl_usd, 2) if trade.pnl_usd else None,
-                "pnl_percent": round(trade.pnl_pct, 4) if trade.pnl_pct else None,
-                "exchange": trade.exchange,
-                "notes": trade.notes,
-            })
-
-        print(f"[SYNC-TO-SUPABASE] Prepared {len(trades_to_insert)} trades for Supabase insertion")
-
-        # Insert into Supabase
-        async with httpx.AsyncClient() as client:
-            print(f"[SYNC-TO-SUPABASE] Sending POST request to {supabase_url}/rest/v1/trades")
-            response = await client.post(
-                f"{supabase_url}/rest/v1/trades",
-                headers={
-                    "apikey": supabase_key,
-                    "Authorization": f"Bearer {supabase_key}",
-                    "Content-Type": "application/json",
-                    "Prefer": "resolution=merge-duplicates",
-                },
-                json=trades_to_insert,
-            )
+        if SUPABASE_HEADERS is None:
+            logger.warning("[SYNC-TO-SUPABASE] Supabase credentials not set, skipping sync")
+            return {"status": "success", "message": "Supabase not configured", "count": len(rows)}
 
-            print(f"[SYNC-TO-SUPABASE] Supabase response status: {response.status_code}")
-            if response.status_code not in [200, 201]:
-                print(f"[SYNC-TO-SUPABASE] Supabase sync failed: {response.status_code} {response.text}")
-                return {"status": "error", "message": f"Supabase error: {response.text}"}
-
-        print(f"[SYNC-TO-SUPABASE] Successfully synced {len(trades_to_insert)} trades to Supabase")
-        return {"status": "success", "message": f"Synced {len(trades_to_insert)} trades to Supabase", "count": len(trades_to_insert)}
+        # Insert into Supabase one batch at a time; each batch is mapped and
+        # serialized on its own so only one batch of dicts is alive at once
+        async with httpx.AsyncClient() as client:
+            for offset in range(0, len(rows), SUPABASE_SYNC_BATCH_SIZE):
+                batch = rows[offset:offset + SUPABASE_SYNC_BATCH_SIZE]
+                payload = orjson.dumps([_to_supabase_row(row) for row in batch])
+
+                logger.debug("[SYNC-TO-SUPABASE] Sending %d trades to %s/rest/v1/trades", len(batch), SUPABASE_URL)
+                response = await client.post(
+                    f"{SUPABASE_URL}/rest/v1/trades",
+                    headers=SUPABASE_HEADERS,
+                    content=payload,
+                )
+
+                logger.debug("[SYNC-TO-SUPABASE] Supabase response status: %d", response.status_code)
+                if response.status_code not in [200, 201]:
+                    logger.error("[SYNC-TO-SUPABASE] Supabase sync failed: %d %s", response.status_code, response.text)
+                    return {"status": "error", "message": f"Supabase error: {response.text}"}
+
+        CoachService.invalidate_user_trades(user_id)
+        logger.info("[SYNC-TO-SUPABASE] Synced %d trades for user %s", len(rows), user_id)
+        return {"status": "success", "message": f"Synced {len(rows)} trades to Supabase", "count": len(rows)}
 
     except Exception as e:
-        print(f"[SYNC-TO-SUPABASE] Error syncing trades to Supabase: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("[SYNC-TO-SUPABASE] Error syncing trades to Supabase: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
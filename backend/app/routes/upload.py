@@ -1,7 +1,7 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-import shutil
+import aiofiles
 import os
-import uuid
+import secrets
 from pathlib import Path
 
 from app.auth import get_current_user, AuthenticatedUser
@@ -15,6 +15,8 @@ UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
 ALLOWED_MIME_TYPES = {'image/jpeg', 'image/png', 'image/gif', 'image/webp'}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+MAGIC_HEADER_SIZE = 16  # Enough for every signature checked in _is_valid_image
+UPLOAD_CHUNK_SIZE = 64 * 1024
 
 
 @router.post("/")
@@ -38,28 +40,34 @@ async def upload_file(
                 detail=f"Invalid file type. Allowed: {', '.join(ALLOWED_MIME_TYPES)}"
             )
 
-        # Read file and check size
-        content = await file.read()
-        if len(content) > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File too large. Maximum size: {MAX_FILE_SIZE // (1024*1024)}MB"
-            )
-
-        # Validate image magic bytes
-        if not _is_valid_image(content):
+        # Validate image magic bytes from the header only
+        header = await file.read(MAGIC_HEADER_SIZE)
+        if not _is_valid_image(header):
             raise HTTPException(
                 status_code=400,
                 detail="Invalid image file"
             )
 
         # Generate unique filename with user prefix for organization
-        filename = f"{current_user.id[:8]}_{uuid.uuid4()}{file_ext}"
+        filename = f"{current_user.id[:8]}_{secrets.token_hex(16)}{file_ext}"
         file_path = UPLOAD_DIR / filename
 
-        # Write file
-        with file_path.open("wb") as buffer:
-            buffer.write(content)
+        # Stream to disk in chunks, aborting as soon as the size limit is exceeded
+        total_size = len(header)
+        try:
+            async with aiofiles.open(file_path, "wb") as buffer:
+                await buffer.write(header)
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    total_size += len(chunk)
+                    if total_size > MAX_FILE_SIZE:
+                        raise HTTPException(
+                            status_code=400,
+                            detail=f"File too large. Maximum size: {MAX_FILE_SIZE // (1024*1024)}MB"
+                        )
+                    await buffer.write(chunk)
+        except Exception:
+            file_path.unlink(missing_ok=True)
+            raise
 
         # Return relative URL (frontend should construct full URL)
         return {"url": f"/static/uploads/{filename}"}
@@ -70,21 +78,24 @@ async def upload_file(
 
 
 def _is_valid_image(content: bytes) -> bool:
-    """Validate image by checking magic bytes"""
+    """Validate image by checking magic bytes (only the file header is needed)"""
     if len(content) < 8:
         return False
 
+    # Dispatch on the first byte so at most one signature is compared
+    header = memoryview(content)
+    first = header[0]
     # JPEG magic bytes
-    if content[:2] == b'\xff\xd8':
-        return True
+    if first == 0xFF:
+        return header[1] == 0xD8
     # PNG magic bytes
-    if content[:8] == b'\x89PNG\r\n\x1a\n':
-        return True
+    if first == 0x89:
+        return header[:8] == b'\x89PNG\r\n\x1a\n'
     # GIF magic bytes
-    if content[:6] in (b'GIF87a', b'GIF89a'):
-        return True
+    if first == 0x47:
+        return header[:6] == b'GIF87a' or header[:6] == b'GIF89a'
     # WebP magic bytes
-    if content[:4] == b'RIFF' and content[8:12] == b'WEBP':
-        return True
+    if first == 0x52:
+        return header[:4] == b'RIFF' and header[8:12] == b'WEBP'
 
     return False
@@ -1,13 +1,23 @@
 from __future__ import annotations
 
 import importlib
+import pkgutil
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Optional
 
+import numpy as np
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app import strategies
 from app.models import Candle as DBCandle
 
+# Strategy modules shipped in app.strategies; bounds what can be imported/cached
+_AVAILABLE_STRATEGIES = frozenset(
+    module.name for module in pkgutil.iter_modules(strategies.__path__)
+)
+_STRATEGY_CACHE: Dict[str, Callable[[Dict[str, np.ndarray]], Dict[str, Any]]] = {}
+
 
 def _parse_dt(value: Optional[str]) -> Optional[datetime]:
     if value is None:
@@ -15,6 +25,18 @@ def _parse_dt(value: Optional[str]) -> Optional[datetime]:
     return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
 
 
+def _get_strategy(strategy_name: str) -> Callable[[Dict[str, np.ndarray]], Dict[str, Any]]:
+    """Resolve a strategy's run_strategy callable, importing it only once."""
+    strategy = _STRATEGY_CACHE.get(strategy_name)
+    if strategy is None:
+        if strategy_name not in _AVAILABLE_STRATEGIES:
+            raise ValueError(f"Unknown strategy: {strategy_name}")
+        module = importlib.import_module(f"app.strategies.{strategy_name}")
+        strategy = getattr(module, "run_strategy")
+        _STRATEGY_CACHE[strategy_name] = strategy
+    return strategy
+
+
 def run_backtest(
     symbol: str,
     timeframe: str,
@@ -23,10 +45,25 @@ def run_backtest(
     strategy_name: str,
     db: Session,
 ) -> Dict[str, Any]:
-    """Run a backtest by loading a strategy dynamically."""
+    """Run a backtest by loading a strategy dynamically.
+
+    Strategies receive candles as a dict of equal-length NumPy arrays keyed by
+    timestamp/open/high/low/close/volume.
+    """
+    strategy = _get_strategy(strategy_name)
+
+    # Core select of just the OHLCV columns: skips ORM hydration and the
+    # Float columns already come back as Python floats
     query = (
-        db.query(DBCandle)
-        .filter(
+        select(
+            DBCandle.open_time,
+            DBCandle.open,
+            DBCandle.high,
+            DBCandle.low,
+            DBCandle.close,
+            DBCandle.volume,
+        )
+        .where(
             DBCandle.symbol == symbol.upper(),
             DBCandle.timeframe == timeframe,
         )
@@ -35,27 +72,30 @@ def run_backtest(
 
     start_dt = _parse_dt(start)
     if start_dt:
-        query = query.filter(DBCandle.open_time >= start_dt)
+        query = query.where(DBCandle.open_time >= start_dt)
 
     end_dt = _parse_dt(end)
     if end_dt:
-        query = query.filter(DBCandle.open_time < end_dt)
-
-    rows = query.all()
-    candles: List[Dict[str, Any]] = [
-        {
-            "timestamp": int(row.open_time.timestamp() * 1000),
-            "open": float(row.open),
-            "high": float(row.high),
-            "low": float(row.low),
-            "close": float(row.close),
-            "volume": float(row.volume),
-        }
-        for row in rows
-    ]
-
-    module = importlib.import_module(f"app.strategies.{strategy_name}")
-    strategy = getattr(module, "run_strategy")
+        query = query.where(DBCandle.open_time < end_dt)
+
+    rows = db.execute(query).all()
+
+    # Columnar (struct-of-arrays) candles so strategies can use NumPy ufuncs
+    # over contiguous float64 arrays instead of per-bar dict lookups
+    count = len(rows)
+    open_times, opens, highs, lows, closes, volumes = zip(*rows) if rows else ((),) * 6
+    candles: Dict[str, np.ndarray] = {
+        "timestamp": np.fromiter(
+            (int(open_time.timestamp() * 1000) for open_time in open_times),
+            dtype=np.int64,
+            count=count,
+        ),
+        "open": np.fromiter(opens, dtype=np.float64, count=count),
+        "high": np.fromiter(highs, dtype=np.float64, count=count),
+        "low": np.fromiter(lows, dtype=np.float64, count=count),
+        "close": np.fromiter(closes, dtype=np.float64, count=count),
+        "volume": np.fromiter(volumes, dtype=np.float64, count=count),
+    }
 
     results = strategy(candles)
 
@@ -3,18 +3,82 @@ Native Blofin API client for fetching perpetual futures trades
 Uses direct API calls instead of CCXT for better data accuracy
 """
 
-import base64
-import hashlib
+import asyncio
+import binascii
+import functools
 import hmac
-import json
+import logging
 import os
+import secrets
+import threading
 import time
-import uuid
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import urlencode
 
 import httpx
+import numpy as np
+import orjson
+
+from app.services.timestamps import iso_from_ms
+
+logger = logging.getLogger(__name__)
+
+
+# Request budget per client. Requests are only delayed once the burst is
+# spent; 429s are retried after Retry-After (or exponential backoff).
+BLOFIN_REQUESTS_PER_SECOND = 5.0
+BLOFIN_REQUEST_BURST = 10
+# Budget shared by every client in the process: BloFin's cap is per IP, so
+# concurrent syncs for different users draw from the same bucket
+BLOFIN_PROCESS_REQUESTS_PER_SECOND = 8.0
+BLOFIN_PROCESS_REQUEST_BURST = 20
+MAX_RATE_LIMIT_RETRIES = 5
+
+# Sent on every client so large payloads (the instruments list is hundreds
+# of KB) come back compressed; httpx decompresses transparently
+DEFAULT_HEADERS = {"Accept-Encoding": "gzip, deflate"}
+
+
+# Instrument specs and leverage settings change rarely; reuse them across
+# syncs within this window
+REFERENCE_DATA_TTL_SECONDS = 3600.0
+
+
+def _ttl_cache(seconds: float, per_account: bool):
+    """
+    Cache a BlofinClient method's result for `seconds`, shared by every
+    client instance (per API key when `per_account`). Arguments are not
+    part of the key: the cached methods only use them for logging. Empty
+    results (failed fetches) are not cached.
+    """
+    def decorator(method):
+        cache: Dict[Optional[str], Tuple[float, Any]] = {}
+
+        @functools.wraps(method)
+        def wrapper(self: "BlofinClient", *args: Any, **kwargs: Any) -> Any:
+            key = self.api_key if per_account else None
+            now = time.monotonic()
+            cached = cache.get(key)
+            if cached is not None and now < cached[0]:
+                return cached[1]
+
+            value = method(self, *args, **kwargs)
+            if value:
+                cache[key] = (now + seconds, value)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+
+def _retry_delay(response: httpx.Response, attempt: int) -> float:
+    """Seconds to wait before retrying a 429 response"""
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return 2.0 ** attempt
 
 
 class BlofinClient:
@@ -23,9 +87,31 @@ class BlofinClient:
     def __init__(self, api_key: str, api_secret: str, passphrase: str) -> None:
         self.api_key = api_key
         self.api_secret = api_secret
+        self.api_secret_bytes = api_secret.encode()
         self.passphrase = passphrase
         self.base_url = os.environ.get("BLOFIN_BASE_URL", "https://openapi.blofin.com")
         self.timeout = 20.0
+        self._limiter = _RateLimiter(
+            BLOFIN_REQUESTS_PER_SECOND, BLOFIN_REQUEST_BURST, parent=_PROCESS_LIMITER
+        )
+        # One pooled client per BlofinClient so paginated calls reuse the
+        # same keep-alive connection instead of handshaking on every request
+        self._client = httpx.Client(
+            http2=True,
+            base_url=self.base_url,
+            headers=DEFAULT_HEADERS,
+            timeout=self.timeout,
+        )
+
+    def close(self) -> None:
+        """Close the underlying HTTP connection pool"""
+        self._client.close()
+
+    def __enter__(self) -> "BlofinClient":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
 
     def _sign(
         self,
@@ -36,32 +122,35 @@ class BlofinClient:
         body: str,
     ) -> str:
         """Generate BloFin signature"""
-        prehash = f"{path_with_query}{method}{timestamp}{nonce}{body}"
-        hex_signature = hmac.new(
-            self.api_secret.encode(),
-            prehash.encode(),
-            hashlib.sha256,
-        ).hexdigest().encode()
-        return base64.b64encode(hex_signature).decode()
-
-    def _request(
+        # One f-string encoded once is cheaper than joining encoded parts
+        prehash = f"{path_with_query}{method}{timestamp}{nonce}{body}".encode()
+        # One-shot hmac.digest runs entirely in OpenSSL, no HMAC object;
+        # hexlify/b2a_base64 stay in bytes instead of round-tripping via str
+        digest = hmac.digest(self.api_secret_bytes, prehash, "sha256")
+        return binascii.b2a_base64(binascii.hexlify(digest), newline=False).decode()
+
+    def _prepare_request(
         self,
         method: str,
         path: str,
-        params: Optional[Dict[str, Any]] = None,
-        body: Optional[Dict[str, Any]] = None,
-    ) -> Dict[str, Any]:
-        """Make HTTP request to Blofin API"""
-        method = method.upper()
+        params: Optional[Dict[str, Any]],
+        body: Optional[Dict[str, Any]],
+    ) -> Tuple[str, Dict[str, str], Optional[bytes]]:
+        """
+        Build the path+query, signed headers and body for a BloFin request.
+        The body is serialized once and the same bytes are signed and sent.
+        """
         query = urlencode(params or {})
         path_with_query = f"{path}?{query}" if query else path
-        url = f"{self.base_url}{path_with_query}"
 
         timestamp = str(int(time.time() * 1000))
-        nonce = str(uuid.uuid4())
-        body_str = json.dumps(body) if body else ""
+        nonce = secrets.token_hex(16)
+        body_bytes = orjson.dumps(body) if body else None
 
-        signature = self._sign(method, path_with_query, timestamp, nonce, body_str)
+        signature = self._sign(
+            method, path_with_query, timestamp, nonce,
+            body_bytes.decode() if body_bytes else "",
+        )
 
         headers = {
             "ACCESS-KEY": self.api_key,
@@ -71,16 +160,15 @@ class BlofinClient:
             "ACCESS-PASSPHRASE": self.passphrase,
             "Content-Type": "application/json",
         }
+        return path_with_query, headers, body_bytes
 
-        with httpx.Client(timeout=self.timeout) as client:
-            response = client.request(
-                method,
-                url,
-                headers=headers,
-                json=body if body else None,
-            )
-            response.raise_for_status()
-            payload = response.json()
+    @staticmethod
+    def _parse_response(response: httpx.Response) -> Dict[str, Any]:
+        """Decode a BloFin response, raising on HTTP or API errors"""
+        response.raise_for_status()
+        # orjson parses fills-history pages several times faster than the
+        # stdlib decoder behind response.json()
+        payload = orjson.loads(response.content)
 
         if payload.get("code") not in (0, "0"):
             raise RuntimeError(
@@ -88,6 +176,54 @@ class BlofinClient:
             )
         return payload
 
+    def _request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        body: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Make HTTP request to Blofin API"""
+        method = method.upper()
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            self._limiter.acquire()
+            # Re-signed per attempt so the timestamp and nonce stay fresh
+            path_with_query, headers, content = self._prepare_request(method, path, params, body)
+            response = self._client.request(
+                method,
+                path_with_query,
+                headers=headers,
+                content=content,
+            )
+            if response.status_code != 429 or attempt == MAX_RATE_LIMIT_RETRIES:
+                break
+            time.sleep(_retry_delay(response, attempt))
+        return self._parse_response(response)
+
+    async def _request_async(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        body: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Make HTTP request to Blofin API on an async client"""
+        method = method.upper()
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            await self._limiter.acquire_async()
+            path_with_query, headers, content = self._prepare_request(method, path, params, body)
+            response = await client.request(
+                method,
+                path_with_query,
+                headers=headers,
+                content=content,
+            )
+            if response.status_code != 429 or attempt == MAX_RATE_LIMIT_RETRIES:
+                break
+            await asyncio.sleep(_retry_delay(response, attempt))
+        return self._parse_response(response)
+
     def fetch_positions(self, inst_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """Fetch current account positions with leverage information"""
         params: Dict[str, Any] = {}
@@ -98,6 +234,7 @@ class BlofinClient:
         positions = data.get("data") or []
         return positions
 
+    @_ttl_cache(REFERENCE_DATA_TTL_SECONDS, per_account=False)
     def fetch_contract_sizes(self, symbols: Optional[List[str]] = None) -> Dict[str, float]:
         """
         Fetch contract sizes for symbols from Blofin API.
@@ -115,21 +252,22 @@ class BlofinClient:
                 if inst_id:
                     contract_map[inst_id] = contract_val
 
-            print(f"📏 Fetched contract sizes for {len(contract_map)} instruments")
-            if symbols:
+            logger.info("Fetched contract sizes for %d BloFin instruments", len(contract_map))
+            if symbols and logger.isEnabledFor(logging.DEBUG):
                 # Show contract sizes for specific symbols if provided
                 for sym in symbols[:5]:
                     if sym in contract_map:
-                        print(f"   {sym}: {contract_map[sym]}")
+                        logger.debug("Contract size %s: %s", sym, contract_map[sym])
 
-            # Cache in the static function
-            get_contract_size._cache = contract_map
+            # Make the sizes available to get_contract_size
+            _store_contract_sizes(contract_map, replace=True)
 
             return contract_map
         except Exception as e:
-            print(f"⚠️ Failed to fetch contract sizes: {e}")
+            logger.warning("Failed to fetch BloFin contract sizes: %s", e)
             return {}
 
+    @_ttl_cache(REFERENCE_DATA_TTL_SECONDS, per_account=True)
     def fetch_leverage_map(self) -> Dict[str, float]:
         """
         Fetch current leverage settings using batch-leverage-info endpoint.
@@ -151,13 +289,13 @@ class BlofinClient:
                 if inst_id and lever:
                     leverage_map[inst_id] = float(lever)
 
-            print(f"📊 Fetched leverage settings for {len(leverage_map)} instruments from batch-leverage-info")
-            if leverage_map:
-                print(f"   Sample: {list(leverage_map.items())[:5]}")
+            logger.info("Fetched leverage settings for %d BloFin instruments from batch-leverage-info", len(leverage_map))
+            if leverage_map and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Leverage sample: %s", list(leverage_map.items())[:5])
 
             return leverage_map
         except Exception as e:
-            print(f"⚠️ batch-leverage-info failed, trying positions endpoint: {e}")
+            logger.warning("BloFin batch-leverage-info failed, trying positions endpoint: %s", e)
             # Fallback to positions endpoint (only returns instruments with open positions)
             try:
                 positions = self.fetch_positions()
@@ -169,10 +307,10 @@ class BlofinClient:
                     if inst_id and lever:
                         leverage_map[inst_id] = float(lever)
 
-                print(f"📊 Fetched leverage settings for {len(leverage_map)} open positions")
+                logger.info("Fetched leverage settings for %d open BloFin positions", len(leverage_map))
                 return leverage_map
             except Exception as e2:
-                print(f"⚠️ Failed to fetch leverage settings: {e2}")
+                logger.warning("Failed to fetch BloFin leverage settings: %s", e2)
                 return {}
 
     def fetch_trade_history(
@@ -181,8 +319,24 @@ class BlofinClient:
         begin: Optional[int] = None,
         end: Optional[int] = None,
         page_limit: int = 100,
-        sleep_seconds: float = 0.2,
         max_pages: int = 10000,  # Safety limit: 10k pages = 1M fills max
+    ) -> List[Dict[str, Any]]:
+        """
+        Blocking wrapper around fetch_trade_history_async.
+        Must not be called from a running event loop.
+        """
+        return asyncio.run(self.fetch_trade_history_async(
+            inst_id, begin, end, page_limit, max_pages
+        ))
+
+    async def fetch_trade_history_async(
+        self,
+        inst_id: Optional[str] = None,
+        begin: Optional[int] = None,
+        end: Optional[int] = None,
+        page_limit: int = 100,
+        max_pages: int = 10000,  # Safety limit: 10k pages = 1M fills max
+        max_concurrency: int = 8,
     ) -> List[Dict[str, Any]]:
         """
         Pull paginated fills history until exhaustion.
@@ -190,22 +344,79 @@ class BlofinClient:
         Supports fetching complete trade history with pagination.
         For users with 3+ years of data, this may take several minutes.
 
+        The `after` cursor makes each page depend on the previous one, so
+        when `begin` is known the [begin, end] range is split into up to
+        `max_concurrency` slices that are paged concurrently. All requests
+        draw from the client's rate limiter, so slices only wait when the
+        request budget is actually spent.
+
         Args:
             inst_id: Specific instrument to fetch (None = all instruments)
             begin: Start timestamp in milliseconds
             end: End timestamp in milliseconds
             page_limit: Number of fills per page (max 100)
-            sleep_seconds: Delay between requests to avoid rate limits
             max_pages: Maximum number of pages to fetch (safety limit)
+            max_concurrency: Maximum number of time slices fetched at once
 
         Returns:
-            List of all fills from Blofin API
+            List of all fills from Blofin API, newest first, each with its
+            `ts` also parsed to an int under `_ts`
         """
+        if begin is not None:
+            range_end = end if end is not None else int(time.time() * 1000)
+            slices = _split_time_range(begin, range_end, max_concurrency)
+        else:
+            slices = [(None, end)]
+
+        progress = _PageBudget(max_pages)
+
+        async with httpx.AsyncClient(
+            http2=True,
+            base_url=self.base_url,
+            headers=DEFAULT_HEADERS,
+            timeout=self.timeout,
+        ) as client:
+            results = await asyncio.gather(*(
+                self._fetch_fills_range(
+                    client, progress, inst_id, slice_begin, slice_end, page_limit
+                )
+                for slice_begin, slice_end in slices
+            ))
+
+        # Slices are newest first; adjacent slices share their boundary
+        # millisecond, so drop fills already taken from the newer slice
+        trades: List[Dict[str, Any]] = []
+        seen_ids = set()
+        for slice_trades in results:
+            for fill in slice_trades:
+                trade_id = fill.get("tradeId")
+                if trade_id not in seen_ids:
+                    seen_ids.add(trade_id)
+                    trades.append(fill)
+
+        if progress.remaining <= 0:
+            logger.warning(
+                "Reached maximum BloFin page limit (%d pages = %d fills). Some data may be missing; "
+                "more than %d historical fills need a higher max_pages.",
+                max_pages, len(trades), max_pages * page_limit,
+            )
+
+        return trades
+
+    async def _fetch_fills_range(
+        self,
+        client: httpx.AsyncClient,
+        progress: "_PageBudget",
+        inst_id: Optional[str],
+        begin: Optional[int],
+        end: Optional[int],
+        page_limit: int,
+    ) -> List[Dict[str, Any]]:
+        """Walk the `after` cursor through one [begin, end] range"""
         trades: List[Dict[str, Any]] = []
         after: Optional[str] = None
-        page_count = 0
 
-        while page_count < max_pages:
+        while progress.remaining > 0:
             params: Dict[str, Any] = {"limit": page_limit}
             if inst_id:
                 params["instId"] = inst_id
@@ -216,17 +427,16 @@ class BlofinClient:
             if after:
                 params["after"] = after
 
-            data = self._request("GET", "/api/v1/trade/fills-history", params=params)
+            data = await self._request_async(client, "GET", "/api/v1/trade/fills-history", params=params)
             page = data.get("data") or []
             if not page:
                 break
 
+            # Parse the timestamp once at ingestion; aggregation sorts on it
+            for fill in page:
+                fill["_ts"] = int(fill.get("ts", 0))
             trades.extend(page)
-            page_count += 1
-
-            # Progress logging every 10 pages (1000 fills)
-            if page_count % 10 == 0:
-                print(f"📥 Fetched {len(trades)} fills so far ({page_count} pages)...")
+            progress.add_page(len(page))
 
             # Stop if we got a partial page (end of data)
             if len(page) < page_limit:
@@ -234,15 +444,81 @@ class BlofinClient:
 
             # Get next page cursor
             after = page[-1]["tradeId"]
-            time.sleep(sleep_seconds)
-
-        if page_count >= max_pages:
-            print(f"⚠️ Reached maximum page limit ({max_pages} pages = {len(trades)} fills). Some data may be missing.")
-            print(f"⚠️ Consider contacting support if you have more than {max_pages * page_limit} historical fills.")
 
         return trades
 
 
+class _RateLimiter:
+    """
+    Token bucket: up to `burst` requests go out immediately, then tokens
+    refill at `rate` per second. Callers only wait when the bucket is empty.
+    Thread-safe and not tied to an event loop, so the sync and async
+    request paths (and clients on different event loops) can share one
+    instance. With a `parent`, every request also takes a token from it.
+    """
+
+    def __init__(self, rate: float, burst: float, parent: Optional["_RateLimiter"] = None) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.parent = parent
+        self._tokens = burst
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token, returning how long the caller must wait for it"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            self._tokens -= 1
+            # A negative balance is a queue of callers already waiting
+            delay = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+        if self.parent is not None:
+            # Both tokens are reserved now; the wait covers the slower bucket
+            delay = max(delay, self.parent._reserve())
+        return delay
+
+    def acquire(self) -> None:
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+
+    async def acquire_async(self) -> None:
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+# Process-wide request budget, the parent of every client's own limiter
+_PROCESS_LIMITER = _RateLimiter(BLOFIN_PROCESS_REQUESTS_PER_SECOND, BLOFIN_PROCESS_REQUEST_BURST)
+
+
+class _PageBudget:
+    """Page limit and progress counter shared by concurrent range fetches"""
+
+    def __init__(self, max_pages: int) -> None:
+        self.remaining = max_pages
+        self.pages = 0
+        self.fills = 0
+
+    def add_page(self, fill_count: int) -> None:
+        self.remaining -= 1
+        self.pages += 1
+        self.fills += fill_count
+        # Progress logging every 10 pages (1000 fills)
+        if self.pages % 10 == 0:
+            logger.debug("Fetched %d BloFin fills so far (%d pages)", self.fills, self.pages)
+
+
+def _split_time_range(begin: int, end: int, parts: int) -> List[Tuple[int, int]]:
+    """Split [begin, end] into up to `parts` equal slices, newest first"""
+    parts = max(1, min(parts, end - begin))
+    step = (end - begin) / parts
+    bounds = [begin + round(step * i) for i in range(parts)] + [end]
+    return [(bounds[i], bounds[i + 1]) for i in reversed(range(parts))]
+
+
 def aggregate_fills_by_order(
     fills: List[Dict[str, Any]],
     leverage_map: Optional[Dict[str, float]] = None
@@ -276,6 +552,8 @@ def aggregate_fills_by_order(
     from collections import defaultdict
 
     leverage_map = leverage_map or {}
+    # Per-position debug lines are only formatted when they'd be emitted
+    debug = logger.isEnabledFor(logging.DEBUG)
 
     # Group fills by symbol first
     by_symbol = defaultdict(list)
@@ -284,100 +562,127 @@ def aggregate_fills_by_order(
         if symbol:
             by_symbol[symbol].append(fill)
 
-    # For each symbol, group fills into complete positions
+    # For each symbol, group fills into complete positions. Each fill's
+    # numeric fields are parsed once into arrays; positions are recorded as
+    # (symbol_fills, start, exits_end, end, map_lever) spans over the sorted
+    # fills: exits are [start:exits_end], entries [exits_end:end].
     positions = []
+    # Per symbol: its (N, 3) span array and the numeric rows those spans cover
+    symbol_spans: List[np.ndarray] = []
+    position_numeric: List[np.ndarray] = []
 
     for symbol, symbol_fills in by_symbol.items():
-        # Sort by timestamp (newest first - Blofin returns in reverse chronological order)
-        symbol_fills.sort(key=lambda x: int(x.get("ts", 0)), reverse=True)
-
-        i = 0
-        while i < len(symbol_fills):
-            position_fills = []
-
-            # Step 1: Collect all consecutive EXIT fills (pnl != 0)
-            while i < len(symbol_fills) and float(symbol_fills[i].get("fillPnl", 0)) != 0:
-                position_fills.append(symbol_fills[i])
-                i += 1
-
-            # Step 2: Collect all consecutive ENTRY fills (pnl == 0)
-            while i < len(symbol_fills) and float(symbol_fills[i].get("fillPnl", 0)) == 0:
-                position_fills.append(symbol_fills[i])
-                i += 1
-
-            # Only add if we have a complete position (both entry and exit)
-            has_entry = any(float(f.get("fillPnl", 0)) == 0 for f in position_fills)
-            has_exit = any(float(f.get("fillPnl", 0)) != 0 for f in position_fills)
-
-            if has_entry and has_exit and position_fills:
-                # Debug: show position grouping for first few positions
-                if len(positions) < 5:
-                    entry_count = sum(1 for f in position_fills if float(f.get("fillPnl", 0)) == 0)
-                    exit_count = sum(1 for f in position_fills if float(f.get("fillPnl", 0)) != 0)
-                    print(f"📍 Position {len(positions)+1} for {symbol}: {exit_count} exit fills + {entry_count} entry fills")
-                positions.append(position_fills)
-            elif position_fills:
-                # Incomplete position - skip
-                pass
-
-    # Now aggregate each position
-    aggregated_fills = []
-    for position_fills in positions:
-        if not position_fills:
+        # Leverage from leverage_map is resolved once per symbol
+        map_lever = str(leverage_map[symbol]) if symbol in leverage_map else None
+        if map_lever is not None and debug:
+            logger.debug("Using leverage %sx for %s from account positions", map_lever, symbol)
+
+        # Sort by timestamp (newest first - Blofin returns in reverse chronological order).
+        # Timestamps come pre-parsed as `_ts` from fetch_trade_history (other
+        # sources are parsed here) and are argsorted in C; the stable sort
+        # keeps equal timestamps in API order, like list.sort(reverse=True) did
+        timestamps = np.fromiter(
+            (f["_ts"] if "_ts" in f else int(f.get("ts", 0)) for f in symbol_fills),
+            dtype=np.int64,
+            count=len(symbol_fills),
+        )
+        order = np.argsort(-timestamps, kind="stable")
+        symbol_fills = [symbol_fills[i] for i in order.tolist()]
+
+        numeric = _parse_fill_numbers(symbol_fills)
+        spans = _find_positions(numeric[:, _PNL])
+        if not len(spans):
             continue
 
-        # Separate entry fills (pnl=0) from exit fills (pnl>0)
-        entry_fills = [f for f in position_fills if float(f.get("fillPnl", 0)) == 0]
-        exit_fills = [f for f in position_fills if float(f.get("fillPnl", 0)) != 0]
+        # Spans are sorted and disjoint, so one mask keeps every position's
+        # rows in order without slicing them out one by one
+        in_position = np.zeros(len(symbol_fills) + 1, dtype=np.int64)
+        in_position[spans[:, 0]] += 1
+        in_position[spans[:, 2]] -= 1
+        position_numeric.append(numeric[np.cumsum(in_position[:-1]) > 0])
+        symbol_spans.append(spans)
+
+        for start, exits_end, end in spans.tolist():
+            # Debug: show position grouping for first few positions
+            if debug and len(positions) < 5:
+                logger.debug(
+                    "Position %d for %s: %d exit fills + %d entry fills",
+                    len(positions) + 1, symbol, exits_end - start, end - exits_end,
+                )
+            positions.append((symbol_fills, start, exits_end, end, map_lever))
+
+    if not positions:
+        return []
+
+    # Per-position sums in one pass over every kept fill: bincount adds each
+    # position's values in fill order, like the sequential sums it replaces
+    numeric = np.concatenate(position_numeric)
+    spans = np.concatenate(symbol_spans)
+    lengths = spans[:, 2] - spans[:, 0]
+    labels = np.repeat(np.arange(len(positions)), lengths)
+    # Row of each position's first exit / first entry fill in `numeric`
+    first_exit_rows = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    first_entry_rows = first_exit_rows + (spans[:, 1] - spans[:, 0])
+    is_entry = numeric[:, _PNL] == 0
+    notional = numeric[:, _PRICE] * numeric[:, _SIZE]
+    # Exits and entries of position i are segments 2i and 2i+1, so one
+    # bincount partitions and sums both sides without boolean-mask copies
+    segments = 2 * labels + is_entry
+
+    def sum_by_position(values: np.ndarray) -> List[float]:
+        return np.bincount(labels, weights=values, minlength=len(positions)).tolist()
+
+    def sum_by_side(values: np.ndarray) -> Tuple[List[float], List[float]]:
+        sums = np.bincount(segments, weights=values, minlength=2 * len(positions))
+        return sums[0::2].tolist(), sums[1::2].tolist()
+
+    exit_sizes, entry_sizes = sum_by_side(numeric[:, _SIZE])
+    exit_notionals, entry_notionals = sum_by_side(notional)
+    pnls = sum_by_position(numeric[:, _PNL])
+    fees = sum_by_position(numeric[:, _FEE])
+    # Fallback prices when a side's total size is zero
+    first_entry_prices = numeric[first_entry_rows, _PRICE].tolist()
+    first_exit_prices = numeric[first_exit_rows, _PRICE].tolist()
 
+    # Now aggregate each position
+    aggregated_fills = []
+    for (symbol_fills, start, exits_end, end, map_lever), total_entry_size, entry_weighted_sum, \
+            total_exit_size, exit_weighted_sum, total_pnl, total_fees, \
+            first_entry_price, first_exit_price in zip(
+        positions, entry_sizes, entry_notionals, exit_sizes, exit_notionals, pnls, fees,
+        first_entry_prices, first_exit_prices,
+    ):
         # Position size comes from ENTRY fills only (not doubled)
-        total_entry_size = sum(float(f.get("fillSize", 0)) for f in entry_fills)
-
-        # Calculate weighted average ENTRY price from entry fills
+        # Weighted average ENTRY price from entry fills
         if total_entry_size > 0:
-            entry_weighted_sum = sum(
-                float(f.get("fillPrice", 0)) * float(f.get("fillSize", 0))
-                for f in entry_fills
-            )
             avg_entry_price = entry_weighted_sum / total_entry_size
         else:
-            avg_entry_price = float(entry_fills[0].get("fillPrice", 0)) if entry_fills else 0
+            avg_entry_price = first_entry_price
 
-        # Calculate weighted average EXIT price from exit fills
-        total_exit_size = sum(float(f.get("fillSize", 0)) for f in exit_fills)
+        # Weighted average EXIT price from exit fills
         if total_exit_size > 0:
-            exit_weighted_sum = sum(
-                float(f.get("fillPrice", 0)) * float(f.get("fillSize", 0))
-                for f in exit_fills
-            )
             avg_exit_price = exit_weighted_sum / total_exit_size
         else:
-            avg_exit_price = float(exit_fills[0].get("fillPrice", 0)) if exit_fills else 0
-
-        # Sum PnL and fees from ALL fills
-        total_pnl = sum(float(f.get("fillPnl", 0)) for f in position_fills)
-        total_fees = sum(float(f.get("fee", 0)) for f in position_fills)
+            avg_exit_price = first_exit_price
 
-        # Get metadata
-        first_fill = entry_fills[0] if entry_fills else position_fills[0]
+        # Get metadata from the first entry fill
+        first_fill = symbol_fills[exits_end]
 
         # Use earliest timestamp from entry fills
-        entry_ts = entry_fills[0].get("ts", "0") if entry_fills else position_fills[0].get("ts", "0")
+        entry_ts = first_fill.get("ts", "0")
 
         # Use latest timestamp from exit fills
-        exit_ts = exit_fills[-1].get("ts", "0") if exit_fills else position_fills[-1].get("ts", "0")
+        exit_ts = symbol_fills[exits_end - 1].get("ts", "0")
 
         # Create aggregated fill
         # Get leverage from leverage_map if available, otherwise default to API values
         inst_id = first_fill.get("instId", "")
-        if inst_id in leverage_map:
-            lever_value = str(leverage_map[inst_id])
-            print(f"✅ Using leverage {lever_value}x for {inst_id} from account positions")
+        if map_lever is not None:
+            lever_value = map_lever
         else:
             lever_value = first_fill.get("lever", "0")
-            margin_value = first_fill.get("margin", "0")
-            if len(aggregated_fills) < 3:
-                print(f"⚠️ No leverage found for {inst_id} in positions, defaulting to {lever_value}x")
+            if debug and len(aggregated_fills) < 3:
+                logger.debug("No leverage found for %s in positions, defaulting to %sx", inst_id, lever_value)
 
         # Use first fill's orderId or tradeId as identifier
         position_id = first_fill.get("orderId", first_fill.get("tradeId", f"{inst_id}_{entry_ts}"))
@@ -405,40 +710,64 @@ def aggregate_fills_by_order(
     return aggregated_fills
 
 
-def get_contract_size(symbol: str, client: Optional['BlofinClient'] = None) -> float:
+# Column order of the arrays returned by _parse_fill_numbers
+_FILL_NUMERIC_FIELDS = ("fillPrice", "fillSize", "fillPnl", "fee")
+_PRICE, _SIZE, _PNL, _FEE = range(len(_FILL_NUMERIC_FIELDS))
+
+
+def _find_positions(pnls: np.ndarray) -> np.ndarray:
     """
-    Get Blofin contract size for a given symbol by fetching from API.
-    Contract sizes vary significantly by symbol:
-    - BTC-USDT: 0.001
-    - ETH-USDT: 0.01
-    - BNB-USDT: 0.01
-    - SOL-USDT: 1
-    - DOGE-USDT: 1000
+    Find complete positions in one symbol's newest-first fill PnLs.
 
-    Reference: https://docs.blofin.com/index.html#get-instruments
+    A position is a run of EXIT fills (pnl != 0) followed by a run of ENTRY
+    fills (pnl == 0); only positions with both are kept. Returns an (N, 3)
+    int64 array of (start, exits_end, end) rows: exits are
+    [start:exits_end], entries [exits_end:end].
     """
-    # Cache contract sizes in memory
-    if not hasattr(get_contract_size, '_cache'):
-        get_contract_size._cache = {}
+    if not len(pnls):
+        return np.empty((0, 3), dtype=np.int64)
 
-    symbol_upper = symbol.upper()
+    # A new position starts at the first fill and wherever an exit follows
+    # an entry; exits always lead their position, so counting them gives
+    # the exit/entry split point
+    is_exit = pnls != 0
+    starts = np.flatnonzero(np.r_[True, is_exit[1:] & ~is_exit[:-1]])
+    ends = np.r_[starts[1:], len(pnls)]
+    exits_end = starts + np.add.reduceat(is_exit.astype(np.int64), starts)
 
-    # Return from cache if available
-    if symbol_upper in get_contract_size._cache:
-        return get_contract_size._cache[symbol_upper]
+    complete = (starts < exits_end) & (exits_end < ends)
+    return np.column_stack((starts, exits_end, ends))[complete]
+
+
+def _parse_fill_numbers(fills: List[Dict[str, Any]]) -> np.ndarray:
+    """Parse the numeric string fields of fills into an (n, 4) float array; missing = 0"""
+    numeric = np.empty((len(fills), len(_FILL_NUMERIC_FIELDS)), dtype=np.float64)
+    for column, field in enumerate(_FILL_NUMERIC_FIELDS):
+        numeric[:, column] = np.fromiter(
+            (float(f.get(field, 0)) for f in fills), dtype=np.float64, count=len(fills)
+        )
+    return numeric
+
+
+# instId -> contract value, filled by fetch_contract_sizes and by
+# get_contract_size's per-symbol lookups
+_CONTRACT_SIZES: Dict[str, float] = {}
+
+
+def _store_contract_sizes(sizes: Dict[str, float], replace: bool = False) -> None:
+    """Record known contract sizes and drop memoized lookups that may be stale"""
+    if replace:
+        _CONTRACT_SIZES.clear()
+    _CONTRACT_SIZES.update(sizes)
+    _lookup_contract_size.cache_clear()
 
-    # Fetch from API if client provided
-    if client:
-        try:
-            data = client._request("GET", "/api/v1/market/instruments", params={"instId": symbol_upper})
-            instruments = data.get("data", [])
-            if instruments:
-                contract_value = float(instruments[0].get("contractValue", 0.01))
-                get_contract_size._cache[symbol_upper] = contract_value
-                print(f"✅ Fetched contract size for {symbol_upper}: {contract_value}")
-                return contract_value
-        except Exception as e:
-            print(f"⚠️ Failed to fetch contract size for {symbol_upper}: {e}")
+
+@functools.lru_cache(maxsize=1024)
+def _lookup_contract_size(symbol: str) -> float:
+    """Known contract size for a symbol (any case), else the defaults"""
+    symbol_upper = symbol.upper()
+    if symbol_upper in _CONTRACT_SIZES:
+        return _CONTRACT_SIZES[symbol_upper]
 
     # Fallback to defaults
     if symbol_upper.startswith('BTC'):
@@ -450,6 +779,43 @@ def get_contract_size(symbol: str, client: Optional['BlofinClient'] = None) -> f
         return 0.01
 
 
+def get_contract_size(symbol: str, client: Optional['BlofinClient'] = None) -> float:
+    """
+    Get Blofin contract size for a given symbol by fetching from API.
+    Contract sizes vary significantly by symbol:
+    - BTC-USDT: 0.001
+    - ETH-USDT: 0.01
+    - BNB-USDT: 0.01
+    - SOL-USDT: 1
+    - DOGE-USDT: 1000
+
+    Reference: https://docs.blofin.com/index.html#get-instruments
+    """
+    # Fetch from API if client provided and the size isn't known yet
+    if client:
+        symbol_upper = symbol.upper()
+        if symbol_upper not in _CONTRACT_SIZES:
+            try:
+                data = client._request("GET", "/api/v1/market/instruments", params={"instId": symbol_upper})
+                instruments = data.get("data", [])
+                if instruments:
+                    contract_value = float(instruments[0].get("contractValue", 0.01))
+                    _store_contract_sizes({symbol_upper: contract_value})
+                    logger.debug("Fetched contract size for %s: %s", symbol_upper, contract_value)
+            except Exception as e:
+                logger.warning("Failed to fetch contract size for %s: %s", symbol_upper, e)
+
+    # Memoized: repeat lookups are a single C-level cache hit
+    return _lookup_contract_size(symbol)
+
+
+def _round_value(val: float, decimals: int = 8) -> float:
+    """Round a float value to specified decimals; overflow, inf and NaN become 0"""
+    if not (-1e15 < val < 1e15):  # Check for overflow range
+        return 0.0
+    return round(val, decimals)
+
+
 def calculate_trade_fields(fill: Dict[str, Any]) -> Dict[str, Any]:
     """
     Calculate all required fields from Blofin fill data.
@@ -476,13 +842,13 @@ def calculate_trade_fields(fill: Dict[str, Any]) -> Dict[str, Any]:
     # Convert timestamps to UTC (universal standard)
     # Frontend will automatically display in each user's local timezone
     if ts_ms > 0:
-        date = datetime.utcfromtimestamp(ts_ms / 1000).isoformat() + "Z"
+        date = iso_from_ms(ts_ms)
     else:
         date = datetime.utcnow().isoformat() + "Z"
 
     # Convert exit timestamp to UTC
     if exit_ts_ms > 0:
-        exit_date = datetime.utcfromtimestamp(exit_ts_ms / 1000).isoformat() + "Z"
+        exit_date = iso_from_ms(exit_ts_ms)
     else:
         exit_date = None
 
@@ -561,28 +927,148 @@ def calculate_trade_fields(fill: Dict[str, Any]) -> Dict[str, Any]:
         pnl_pct = 0.0
 
     # Round all numeric values to prevent precision overflow
-    def round_value(val: float, decimals: int = 8) -> float:
-        """Round a float value to specified decimals"""
-        if val is None or not isinstance(val, (int, float)):
-            return 0.0
-        if not (-1e15 < val < 1e15):  # Check for overflow range
-            return 0.0
-        rounded = round(val, decimals)
-        # Ensure it's not infinity or NaN
-        if not (-1e15 < rounded < 1e15):
-            return 0.0
-        return rounded
-
     return {
         "date": date,
         "exit_date": exit_date,  # Exit timestamp (when trade closed)
         "symbol": symbol,
         "side": side,
-        "entry": round_value(entry, 8),
-        "exit": round_value(exit_price, 8),
-        "size": round_value(size, 8),
-        "leverage": round_value(leverage, 2),
-        "fees": round_value(fees, 8),
-        "pnl_usd": round_value(pnl_usd, 2),
-        "pnl_pct": round_value(pnl_pct, 4),
+        "entry": _round_value(entry, 8),
+        "exit": _round_value(exit_price, 8),
+        "size": _round_value(size, 8),
+        "leverage": _round_value(leverage, 2),
+        "fees": _round_value(fees, 8),
+        "pnl_usd": _round_value(pnl_usd, 2),
+        "pnl_pct": _round_value(pnl_pct, 4),
     }
+
+
+# Side names calculate_trade_fields maps BloFin's entry side to
+_POSITION_SIDES = {"BUY": "LONG", "SELL": "SHORT"}
+
+
+def _round_column(values: np.ndarray, decimals: int) -> List[float]:
+    """
+    _round_value over a column: overflow, inf and NaN become 0. Rounds with
+    Python's round() like the scalar path; np.round disagrees with it on
+    halfway values (fee 0.000045155 -> 4.516e-05 vs 4.515e-05)
+    """
+    return [round(value, decimals) for value in np.where(np.abs(values) < 1e15, values, 0.0).tolist()]
+
+
+def calculate_trade_fields_batch(fills: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+    """
+    calculate_trade_fields for a list of aggregated fills. The numeric
+    fields are parsed into arrays once and every derived value is computed
+    column-wise. Output is aligned with `fills` (None for invalid trades
+    and for fills that can't be parsed).
+    """
+    try:
+        return _calculate_trade_fields_columns(fills)
+    except (ValueError, TypeError):
+        # One malformed fill fails the column-wise parse for all of them, so
+        # redo the batch fill by fill and drop only the fills that fail
+        results: List[Optional[Dict[str, Any]]] = []
+        for fill in fills:
+            try:
+                results.append(calculate_trade_fields(fill))
+            except Exception as e:
+                logger.warning("Failed to process trade %s: %s", fill.get("tradeId"), e)
+                results.append(None)
+        return results
+
+
+def _calculate_trade_fields_columns(fills: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+    """calculate_trade_fields_batch's column-wise pass; raises if any fill is malformed"""
+    count = len(fills)
+    if not count:
+        return []
+
+    numeric = _parse_fill_numbers(fills)
+    entry = numeric[:, _PRICE]
+    pnl_usd = numeric[:, _PNL]
+    fees = numeric[:, _FEE]
+
+    # Contract counts -> coin quantity (see calculate_trade_fields)
+    contract_sizes = np.fromiter(
+        (get_contract_size(f.get("instId", "")) for f in fills), dtype=np.float64, count=count
+    )
+    size = numeric[:, _SIZE] * contract_sizes
+
+    api_leverage = np.fromiter(
+        (float(f["lever"]) if f.get("lever") else 0.0 for f in fills), dtype=np.float64, count=count
+    )
+    margin = np.fromiter(
+        (float(f["margin"]) if f.get("margin") else 0.0 for f in fills), dtype=np.float64, count=count
+    )
+    has_exit = np.fromiter((bool(f.get("exitPrice")) for f in fills), dtype=bool, count=count)
+    exit_in = np.fromiter(
+        (float(f["exitPrice"]) if f.get("exitPrice") else 0.0 for f in fills), dtype=np.float64, count=count
+    )
+
+    sides = [
+        _POSITION_SIDES.get(side, side)
+        for side in (f.get("side", "").upper() for f in fills)
+    ]
+    is_long = np.fromiter((side == "LONG" for side in sides), dtype=bool, count=count)
+    is_short = np.fromiter((side == "SHORT" for side in sides), dtype=bool, count=count)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Exit price from aggregation if available, otherwise derived from PnL
+        pnl_per_unit = pnl_usd / size
+        derived_exit = np.where(
+            is_long, entry + pnl_per_unit, np.where(is_short, entry - pnl_per_unit, entry)
+        )
+        can_derive = (pnl_usd != 0) & (size != 0) & (entry != 0)
+        exit_price = np.where(has_exit, exit_in, np.where(can_derive, derived_exit, entry))
+
+        # Leverage from API, else position value / margin, else 1x
+        position_value = entry * size
+        leverage = np.where(
+            api_leverage > 0,
+            api_leverage,
+            np.where((margin > 0) & (entry > 0) & (size > 0), position_value / margin, 1.0),
+        )
+
+        # PnL% = PnL USD / (Position Value / Leverage) * 100
+        pnl_pct = np.where(
+            (position_value > 0) & (leverage > 0),
+            pnl_usd / (position_value / leverage) * 100,
+            0.0,
+        )
+
+    columns = zip(
+        _round_column(entry, 8),
+        _round_column(exit_price, 8),
+        _round_column(size, 8),
+        _round_column(leverage, 2),
+        _round_column(fees, 8),
+        _round_column(pnl_usd, 2),
+        _round_column(pnl_pct, 4),
+    )
+
+    results: List[Optional[Dict[str, Any]]] = []
+    for fill, side, is_valid, (entry_r, exit_r, size_r, leverage_r, fees_r, pnl_r, pct_r) in zip(
+        fills, sides, (entry != 0).tolist(), columns
+    ):
+        # Skip trades with exactly 0 entry price (invalid/rejected orders only)
+        if not is_valid:
+            results.append(None)
+            continue
+
+        ts_ms = int(fill.get("ts", 0))
+        exit_ts_ms = int(fill.get("exit_ts", 0))
+        results.append({
+            "date": iso_from_ms(ts_ms) if ts_ms > 0 else datetime.utcnow().isoformat() + "Z",
+            "exit_date": iso_from_ms(exit_ts_ms) if exit_ts_ms > 0 else None,
+            "symbol": fill.get("instId", ""),
+            "side": side,
+            "entry": entry_r,
+            "exit": exit_r,
+            "size": size_r,
+            "leverage": leverage_r,
+            "fees": fees_r,
+            "pnl_usd": pnl_r,
+            "pnl_pct": pct_r,
+        })
+
+    return results
@@ -4,7 +4,9 @@ Provides superior reasoning, 200K context window, and streaming support.
 """
 
 import os
+import hashlib
 import logging
+import time
 from dotenv import load_dotenv
 
 # Load environment variables before accessing them
@@ -12,6 +14,9 @@ load_dotenv()
 from typing import List, Dict, Optional, Tuple, AsyncGenerator
 import asyncio
 
+import orjson
+import pandas as pd
+
 try:
     from anthropic import AsyncAnthropic, RateLimitError, APIError
 except ImportError:
@@ -32,6 +37,17 @@ elif AsyncAnthropic is None:
 else:
     client = AsyncAnthropic(api_key=ANTHROPIC_API_KEY)
 
+# Built system prompts are reused while the same user context comes back
+# within this window (e.g. several questions in a row)
+PROMPT_CACHE_TTL_SECONDS = 60.0
+PROMPT_CACHE_MAX_ENTRIES = 256
+
+# user_context fields _build_user_context renders besides the trades
+_RENDERED_CONTEXT_FIELDS = ("insights", "statistics", "patterns", "recent_mistakes")
+
+# Marks a system prompt block as a prefix Anthropic may cache server-side
+EPHEMERAL_CACHE_CONTROL = {"type": "ephemeral"}
+
 
 # Elite Trading Coach System Prompt
 TRADING_COACH_SYSTEM_PROMPT = """You are an elite crypto trading coach with over 10 years of experience in cryptocurrency markets, technical analysis, and trading psychology. You have helped hundreds of traders improve their performance and develop consistent profitability.
@@ -64,6 +80,51 @@ TRADING_COACH_SYSTEM_PROMPT = """You are an elite crypto trading coach with over
 - Consider the emotional state implied by their trading patterns"""
 
 
+# Bound "$1,234.56" formatter for the per-trade loops; calling it skips
+# re-parsing the format spec on every f-string interpolation
+_usd = "${:,.2f}".format
+
+# Fallbacks for fields missing from a trade, merged in once per trade
+# ({**defaults, **trade}) instead of a .get(key, default) per placeholder
+_TRADE_DEFAULTS = {
+    "symbol": "Unknown",
+    "side": "Unknown",
+    "entry": 0,
+    "exit": 0,
+    "size": 0,
+    "leverage": 1,
+    "pnl_usd": 0,
+    "pnl_pct": 0,
+    "date": "Unknown",
+    "notes": "None provided",
+}
+_SUMMARY_TRADE_DEFAULTS = {"symbol": "N/A", "side": "N/A", "pnl_usd": 0}
+
+
+def format_recent_trades(trades: List[Dict]) -> str:
+    """
+    Markdown lines for the RECENT TRADES section of the coach context (last 20
+    trades). Context builders store this as user_context["_formatted_trades_md"]
+    so it is rendered once per context rather than once per Claude call.
+    """
+    trade_parts = []
+    for t in trades[:20]:
+        outcome = "WIN" if t.get('pnl_usd', 0) > 0 else "LOSS"
+        trade_parts.append(f"- {t.get('date', 'N/A')[:10]} | {t.get('symbol', 'N/A')} | {t.get('side', 'N/A')} | Entry: {_usd(t.get('entry', 0))} → Exit: {_usd(t.get('exit', 0))} | PnL: {_usd(t.get('pnl_usd', 0))} ({outcome})")
+        if t.get('notes'):
+            trade_parts.append(f" | Notes: \"{t.get('notes')[:50]}...\"")
+        trade_parts.append("\n")
+    return "".join(trade_parts)
+
+
+def _pnl_frame(trades: List[Dict]) -> pd.DataFrame:
+    """symbol / pnl_usd columns of `trades`, with the defaults the summaries use"""
+    frame = pd.DataFrame.from_records(trades, columns=["symbol", "pnl_usd"])
+    frame["symbol"] = frame["symbol"].fillna("Unknown")
+    frame["pnl_usd"] = frame["pnl_usd"].fillna(0).astype("float64")
+    return frame
+
+
 class ClaudeService:
     """Service for interacting with Anthropic Claude API for trading coach responses."""
 
@@ -80,15 +141,19 @@ class ClaudeService:
         if not client:
             raise RuntimeError("Anthropic API key not configured. Set ANTHROPIC_API_KEY environment variable.")
         self.client = client
+        # digest of (base prompt, user context)
+        #   -> (built at, system prompt blocks, their estimated tokens)
+        self._prompt_cache: Dict[bytes, Tuple[float, List[Dict], int]] = {}
 
     @staticmethod
     def estimate_tokens(text: str) -> int:
         """
         Estimate tokens in a string.
         Claude doesn't expose a public tokenizer, so we use rough estimation.
-        Average is ~4 characters per token for English text.
+        Average is ~4 characters per token for English text; partial
+        tokens round up, so the budget check errs on the safe side.
         """
-        return max(1, len(text) // 4)
+        return (len(text) + 3) >> 2 or 1
 
     def _build_user_context(self, user_context: Dict) -> str:
         """Build a formatted user context string for the system prompt."""
@@ -113,55 +178,134 @@ class ClaudeService:
         # Statistics Section
         if user_context.get("statistics"):
             stats = user_context["statistics"]
-            stats_text = f"""
+            stats_parts = [f"""
 ## CURRENT STATISTICS
 - **Total Trades**: {stats.get('total_trades', 0)}
 - **Win Rate**: {stats.get('win_rate_pct', 0):.1f}%
 - **Total PnL**: ${stats.get('total_pnl_usd', 0):,.2f}
 - **Average PnL per Trade**: ${stats.get('avg_pnl_usd', 0):,.2f}
 - **Trades This Week**: {stats.get('trades_this_week', 0)}
-"""
+"""]
             if stats.get('best_trade'):
                 best = stats['best_trade']
-                stats_text += f"- **Best Trade**: {best.get('symbol', 'N/A')} +${best.get('pnl_usd', 0):,.2f} on {best.get('date', 'N/A')}\n"
+                stats_parts.append(f"- **Best Trade**: {best.get('symbol', 'N/A')} +${best.get('pnl_usd', 0):,.2f} on {best.get('date', 'N/A')}\n")
             if stats.get('worst_trade'):
                 worst = stats['worst_trade']
-                stats_text += f"- **Worst Trade**: {worst.get('symbol', 'N/A')} ${worst.get('pnl_usd', 0):,.2f} on {worst.get('date', 'N/A')}\n"
-            sections.append(stats_text)
+                stats_parts.append(f"- **Worst Trade**: {worst.get('symbol', 'N/A')} ${worst.get('pnl_usd', 0):,.2f} on {worst.get('date', 'N/A')}\n")
+            sections.append("".join(stats_parts))
 
         # Detected Patterns Section
         if user_context.get("patterns"):
             patterns = user_context["patterns"]
             if patterns:
-                pattern_text = "\n## DETECTED PATTERNS\n"
-                for p in patterns[:5]:  # Top 5 patterns
-                    pattern_text += f"- **{p.get('pattern_type', 'Unknown')}**: {p.get('description', '')} (Win Rate: {p.get('win_rate', 0)*100:.1f}%, Frequency: {p.get('frequency', 0)})\n"
-                sections.append(pattern_text)
+                pattern_parts = ["\n## DETECTED PATTERNS\n"]
+                pattern_parts.extend(
+                    f"- **{p.get('pattern_type', 'Unknown')}**: {p.get('description', '')} (Win Rate: {p.get('win_rate', 0)*100:.1f}%, Frequency: {p.get('frequency', 0)})\n"
+                    for p in patterns[:5]  # Top 5 patterns
+                )
+                sections.append("".join(pattern_parts))
 
         # Recent Mistakes Section
         if user_context.get("recent_mistakes"):
             mistakes = user_context["recent_mistakes"]
             if mistakes:
-                mistake_text = "\n## RECENT MISTAKES DETECTED\n"
-                for m in mistakes[:5]:
-                    mistake_text += f"- **{m.get('type', 'Unknown')}** ({m.get('severity', 'info')}): {m.get('description', '')}\n"
-                sections.append(mistake_text)
+                mistake_parts = ["\n## RECENT MISTAKES DETECTED\n"]
+                mistake_parts.extend(
+                    f"- **{m.get('type', 'Unknown')}** ({m.get('severity', 'info')}): {m.get('description', '')}\n"
+                    for m in mistakes[:5]
+                )
+                sections.append("".join(mistake_parts))
 
         # Recent Trades Section
-        if user_context.get("trades"):
-            trades = user_context["trades"]
-            if trades:
-                trades_text = "\n## RECENT TRADES (Last 20)\n"
-                for t in trades[:20]:
-                    outcome = "WIN" if t.get('pnl_usd', 0) > 0 else "LOSS"
-                    trades_text += f"- {t.get('date', 'N/A')[:10]} | {t.get('symbol', 'N/A')} | {t.get('side', 'N/A')} | Entry: ${t.get('entry', 0):,.2f} → Exit: ${t.get('exit', 0):,.2f} | PnL: ${t.get('pnl_usd', 0):,.2f} ({outcome})"
-                    if t.get('notes'):
-                        trades_text += f" | Notes: \"{t.get('notes')[:50]}...\""
-                    trades_text += "\n"
-                sections.append(trades_text)
+        formatted_trades = user_context.get("_formatted_trades_md")
+        if formatted_trades is None and user_context.get("trades"):
+            formatted_trades = format_recent_trades(user_context["trades"])
+        if formatted_trades:
+            sections.append(f"\n## RECENT TRADES (Last 20)\n{formatted_trades}")
 
         return "\n".join(sections)
 
+    @staticmethod
+    def _prompt_cache_key(base_prompt: str, user_context: Dict) -> bytes:
+        """
+        Digest identifying a (base prompt, user context) pair. Only the fields
+        _build_user_context renders are hashed, so per-message additions
+        (relevant_past_context, query_topics) don't defeat the cache.
+        """
+        digest = hashlib.blake2b(base_prompt.encode(), digest_size=16)
+        formatted_trades = user_context.get("_formatted_trades_md")
+        digest.update(orjson.dumps(
+            [user_context.get(name) for name in _RENDERED_CONTEXT_FIELDS]
+            + [formatted_trades if formatted_trades is not None else user_context.get("trades")],
+            default=str,
+            option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+        ))
+        return digest.digest()
+
+    def _build_system_prompt(
+        self, system_prompt: Optional[str], user_context: Optional[Dict]
+    ) -> Tuple[List[Dict], int]:
+        """
+        System prompt blocks with the formatted user context and their
+        estimated token count, both cached briefly.
+
+        The coach instructions and the trader data are separate blocks, each
+        marked cacheable, so Anthropic reuses the instructions prefix across
+        users and the full prompt across one user's consecutive questions.
+        """
+        base_prompt = system_prompt or TRADING_COACH_SYSTEM_PROMPT
+        base_block = {"type": "text", "text": base_prompt, "cache_control": EPHEMERAL_CACHE_CONTROL}
+        if not user_context:
+            return [base_block], self.estimate_tokens(base_prompt)
+
+        key = self._prompt_cache_key(base_prompt, user_context)
+        now = time.monotonic()
+        cached = self._prompt_cache.get(key)
+        if cached and now - cached[0] < PROMPT_CACHE_TTL_SECONDS:
+            return cached[1], cached[2]
+
+        context_str = self._build_user_context(user_context)
+        context_text = f"---\n\n# TRADER DATA\n{context_str}"
+        system_blocks = [
+            base_block,
+            {"type": "text", "text": context_text, "cache_control": EPHEMERAL_CACHE_CONTROL},
+        ]
+
+        if len(self._prompt_cache) >= PROMPT_CACHE_MAX_ENTRIES:
+            # Drop expired entries, then the oldest if still full
+            for stale_key in [k for k, (built_at, _, _) in self._prompt_cache.items()
+                              if now - built_at >= PROMPT_CACHE_TTL_SECONDS]:
+                del self._prompt_cache[stale_key]
+            if len(self._prompt_cache) >= PROMPT_CACHE_MAX_ENTRIES:
+                del self._prompt_cache[next(iter(self._prompt_cache))]
+        prompt_tokens = self.estimate_tokens(base_prompt) + self.estimate_tokens(context_text)
+        # Re-insert so dict order stays oldest-first
+        self._prompt_cache.pop(key, None)
+        self._prompt_cache[key] = (now, system_blocks, prompt_tokens)
+        return system_blocks, prompt_tokens
+
+    @staticmethod
+    def _input_tokens(usage) -> int:
+        """
+        Prompt tokens of a response. With prompt caching the API reports
+        cached and newly cached prefix tokens apart from input_tokens.
+        """
+        return (
+            usage.input_tokens
+            + (getattr(usage, "cache_creation_input_tokens", None) or 0)
+            + (getattr(usage, "cache_read_input_tokens", None) or 0)
+        )
+
+    def _check_context_budget(self, system_tokens: int, messages: List[Dict]) -> None:
+        """Fail fast, before a round-trip, when the request can't fit the context window"""
+        total_tokens = system_tokens
+        for message in messages:
+            content = message.get("content", "")
+            total_tokens += self.estimate_tokens(content if isinstance(content, str) else str(content))
+        if total_tokens > self.MAX_CONTEXT_TOKENS:
+            logger.warning("Claude request over context budget: ~%d tokens", total_tokens)
+            raise RuntimeError("Conversation too long. Please start a new chat.")
+
     async def get_coach_response(
         self,
         system_prompt: Optional[str],
@@ -189,13 +333,10 @@ class ClaudeService:
         if not client:
             raise RuntimeError("Anthropic API key not configured.")
 
-        # Build the full system prompt with user context
-        base_prompt = system_prompt or TRADING_COACH_SYSTEM_PROMPT
-        if user_context:
-            context_str = self._build_user_context(user_context)
-            full_system_prompt = f"{base_prompt}\n\n---\n\n# TRADER DATA\n{context_str}"
-        else:
-            full_system_prompt = base_prompt
+        # Build the full system prompt with user context; the budget check
+        # runs once, not per retry
+        system_blocks, system_tokens = self._build_system_prompt(system_prompt, user_context)
+        self._check_context_budget(system_tokens, messages)
 
         model = self.MODEL_DEEP if use_deep_model else self.MODEL
 
@@ -205,17 +346,20 @@ class ClaudeService:
                 response = await self.client.messages.create(
                     model=model,
                     max_tokens=self.MAX_TOKENS,
-                    system=full_system_prompt,
+                    system=system_blocks,
                     messages=messages,
                 )
 
                 # Extract response
                 response_text = response.content[0].text
-                input_tokens = response.usage.input_tokens
+                input_tokens = self._input_tokens(response.usage)
                 output_tokens = response.usage.output_tokens
 
                 logger.info(
-                    f"Claude coach response generated: {input_tokens} input tokens, {output_tokens} output tokens"
+                    "Claude coach response generated: %d input tokens (%d from cache), %d output tokens",
+                    input_tokens,
+                    getattr(response.usage, "cache_read_input_tokens", None) or 0,
+                    output_tokens,
                 )
 
                 return response_text, input_tokens, output_tokens
@@ -223,21 +367,21 @@ class ClaudeService:
             except RateLimitError as e:
                 retries += 1
                 if retries >= max_retries:
-                    logger.error(f"Rate limit exceeded after {max_retries} retries: {e}")
+                    logger.error("Rate limit exceeded after %d retries: %s", max_retries, e)
                     raise RuntimeError("Claude API rate limit exceeded. Please try again in a moment.")
                 wait_time = min(2 ** retries, 30)
-                logger.warning(f"Rate limit hit. Retrying in {wait_time}s (attempt {retries}/{max_retries})")
+                logger.warning("Rate limit hit. Retrying in %ds (attempt %d/%d)", wait_time, retries, max_retries)
                 await asyncio.sleep(wait_time)
 
             except APIError as e:
-                logger.error(f"Claude API error: {e}")
+                logger.error("Claude API error: %s", e)
                 error_str = str(e).lower()
                 if "context" in error_str or "token" in error_str:
                     raise RuntimeError("Conversation too long. Please start a new chat.")
                 raise RuntimeError(f"Claude API error: {str(e)[:100]}")
 
             except Exception as e:
-                logger.error(f"Unexpected error calling Claude API: {e}")
+                logger.error("Unexpected error calling Claude API: %s", e)
                 raise RuntimeError(f"Failed to get coach response: {str(e)[:100]}")
 
         raise RuntimeError("Failed to get response after maximum retries")
@@ -247,32 +391,35 @@ class ClaudeService:
         system_prompt: Optional[str],
         messages: List[Dict],
         user_context: Optional[Dict] = None,
+        usage: Optional[Dict] = None,
     ) -> AsyncGenerator[str, None]:
         """
         Get streaming response from Claude API.
-        Yields text chunks as they arrive.
+        Yields text chunks as they arrive. When given, `usage` is filled with
+        input_tokens/output_tokens once the stream completes.
         """
         if not client:
             raise RuntimeError("Anthropic API key not configured.")
 
-        base_prompt = system_prompt or TRADING_COACH_SYSTEM_PROMPT
-        if user_context:
-            context_str = self._build_user_context(user_context)
-            full_system_prompt = f"{base_prompt}\n\n---\n\n# TRADER DATA\n{context_str}"
-        else:
-            full_system_prompt = base_prompt
+        system_blocks, system_tokens = self._build_system_prompt(system_prompt, user_context)
+        self._check_context_budget(system_tokens, messages)
 
         try:
             async with self.client.messages.stream(
                 model=self.MODEL,
                 max_tokens=self.MAX_TOKENS,
-                system=full_system_prompt,
+                system=system_blocks,
                 messages=messages,
             ) as stream:
                 async for text in stream.text_stream:
                     yield text
+
+                if usage is not None:
+                    final_message = await stream.get_final_message()
+                    usage["input_tokens"] = self._input_tokens(final_message.usage)
+                    usage["output_tokens"] = final_message.usage.output_tokens
         except Exception as e:
-            logger.error(f"Streaming error: {e}")
+            logger.error("Streaming error: %s", e)
             raise RuntimeError(f"Streaming failed: {str(e)[:100]}")
 
     async def analyze_trade(
@@ -290,18 +437,19 @@ class ClaudeService:
         Returns:
             Tuple of (analysis_text, input_tokens, output_tokens)
         """
+        t = {**_TRADE_DEFAULTS, **trade}
         analysis_prompt = f"""Analyze this trade in detail:
 
 **Trade Details:**
-- Symbol: {trade.get('symbol', 'Unknown')}
-- Side: {trade.get('side', 'Unknown')}
-- Entry Price: ${trade.get('entry', 0):,.2f}
-- Exit Price: ${trade.get('exit', 0):,.2f}
-- Size: {trade.get('size', 0)}
-- Leverage: {trade.get('leverage', 1)}x
-- PnL: ${trade.get('pnl_usd', 0):,.2f} ({trade.get('pnl_pct', 0):.2f}%)
-- Date: {trade.get('date', 'Unknown')}
-- Notes: {trade.get('notes', 'None provided')}
+- Symbol: {t['symbol']}
+- Side: {t['side']}
+- Entry Price: ${t['entry']:,.2f}
+- Exit Price: ${t['exit']:,.2f}
+- Size: {t['size']}
+- Leverage: {t['leverage']}x
+- PnL: ${t['pnl_usd']:,.2f} ({t['pnl_pct']:.2f}%)
+- Date: {t['date']}
+- Notes: {t['notes']}
 
 Provide:
 1. **Entry Analysis**: Was this a good entry? What was the likely reasoning?
@@ -332,13 +480,14 @@ Provide:
         if not trades:
             return "No trades were executed today. Rest is important for a trader's longevity.", 0, 0
 
-        total_pnl = sum(t.get('pnl_usd', 0) for t in trades)
-        wins = sum(1 for t in trades if t.get('pnl_usd', 0) > 0)
+        pnl = _pnl_frame(trades)["pnl_usd"]
+        total_pnl = float(pnl.sum())
+        wins = int((pnl > 0).sum())
         losses = len(trades) - wins
 
         trades_summary = "\n".join([
-            f"- {t.get('symbol', 'N/A')} {t.get('side', 'N/A')}: ${t.get('pnl_usd', 0):,.2f}"
-            for t in trades
+            f"- {t['symbol']} {t['side']}: {_usd(t['pnl_usd'])}"
+            for t in [{**_SUMMARY_TRADE_DEFAULTS, **trade} for trade in trades]
         ])
 
         summary_prompt = f"""Generate a daily trading summary for today's session:
@@ -374,21 +523,22 @@ Keep it concise but insightful (3-4 paragraphs max)."""
         if not trades:
             return "No trades this week. Consider if you're waiting for the right setups or avoiding the market.", 0, 0
 
-        total_pnl = sum(t.get('pnl_usd', 0) for t in trades)
-        wins = sum(1 for t in trades if t.get('pnl_usd', 0) > 0)
+        frame = _pnl_frame(trades)
+        total_pnl = float(frame["pnl_usd"].sum())
+        wins = int((frame["pnl_usd"] > 0).sum())
         win_rate = (wins / len(trades) * 100) if trades else 0
 
-        # Group by symbol
-        by_symbol = {}
-        for t in trades:
-            sym = t.get('symbol', 'Unknown')
-            if sym not in by_symbol:
-                by_symbol[sym] = []
-            by_symbol[sym].append(t)
+        # Group by symbol (first-seen order), best PnL first; the stable
+        # sort keeps first-seen order among equal totals
+        by_symbol = (
+            frame.groupby("symbol", sort=False)["pnl_usd"]
+            .agg(["count", "sum"])
+            .sort_values("sum", ascending=False, kind="stable")
+        )
 
         symbol_summary = "\n".join([
-            f"- {sym}: {len(trades)} trades, ${sum(t.get('pnl_usd', 0) for t in trades):,.2f} PnL"
-            for sym, trades in sorted(by_symbol.items(), key=lambda x: sum(t.get('pnl_usd', 0) for t in x[1]), reverse=True)
+            f"- {sym}: {count} trades, {_usd(pnl_sum)} PnL"
+            for sym, count, pnl_sum in by_symbol.itertuples()
         ])
 
         report_prompt = f"""Generate a comprehensive weekly trading report:
@@ -7,22 +7,41 @@ Includes memory extraction to learn from each conversation.
 
 import logging
 import asyncio
-from typing import List, Dict, Tuple
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, List, Dict, Optional, Tuple
 from sqlalchemy.orm import Session
 from datetime import datetime
-import uuid
 import csv
+import warnings
 from io import StringIO
 
-from app.models import Trade
+import pandas as pd
+
+from app.models import Trade, new_trade_id
 from app.services.claude_service import ClaudeService
 from app.services.context_builder import ContextBuilder
 from app.services.supabase_client import SupabaseClient
-from app.services.memory_extractor import MemoryExtractor, ProgressTracker
+from app.services.memory_extractor import MemoryExtractionBatcher, MemoryExtractor, ProgressTracker
 from app.services.memory_manager import MemoryManager
+from app.services.response_cache import SemanticResponseCache
 
 logger = logging.getLogger(__name__)
 
+# Imported CSV rows are inserted in chunks of this many trades
+IMPORT_INSERT_CHUNK_SIZE = 1000
+
+# The UI re-reads conversations and conversation lists between writes; serve
+# repeats from memory for this long (writes through CoachService invalidate)
+CONVERSATION_CACHE_TTL_SECONDS = 30.0
+CONVERSATION_CACHE_MAX_ENTRIES = 1024
+
+# Background memory extractions running at once (one full extraction batch)
+# and waiting in total; exchanges past the pending limit are not extracted
+MAX_CONCURRENT_EXTRACTIONS = MemoryExtractionBatcher.MAX_BATCH
+MAX_PENDING_EXTRACTIONS = 256
+
 # Coach system prompt template
 COACH_SYSTEM_PROMPT_TEMPLATE = """You are an expert crypto trading coach with 10+ years of experience trading perpetuals and spot markets.
 Your role is to help traders improve their performance through personalized, actionable coaching.
@@ -50,9 +69,196 @@ Your goal: Help them become a more profitable, disciplined, and consistent trade
 Remember: You have access to all their trade data, notes, and historical advice. Use this to provide increasingly personalized coaching."""
 
 
+def _csv_column(frame: pd.DataFrame, *names: str, default: str = "") -> List[str]:
+    """Values of the first of `names` in the CSV header, else `default` for every row."""
+    for name in names:
+        if name in frame.columns:
+            return frame[name].tolist()
+    return [default] * len(frame)
+
+
+def _parse_column(
+    values: List[str], parse: Callable[[str], Any], present: Optional[List[bool]] = None
+) -> Tuple[List[Any], List[Optional[str]]]:
+    """
+    `parse` of each value (None where not `present`), plus the ValueError
+    message of each value `parse` rejects (None elsewhere).
+    """
+    no_errors = [None] * len(values)
+    try:
+        # Whole-column fast path: one try block instead of one per value; a
+        # bad value falls through to the slow path
+        if present is None:
+            return [parse(v) for v in values], no_errors
+        return [parse(v) if p else None for v, p in zip(values, present)], no_errors
+    except ValueError:
+        pass
+
+    parsed = []
+    errors = []
+    for i, v in enumerate(values):
+        if present is not None and not present[i]:
+            parsed.append(None)
+            errors.append(None)
+            continue
+        try:
+            parsed.append(parse(v))
+            errors.append(None)
+        except ValueError as e:
+            parsed.append(None)
+            errors.append(str(e))
+    return parsed, errors
+
+
+def _read_csv_text(csv_content: str) -> pd.DataFrame:
+    """
+    Every CSV value as text, one column per header field. Like csv.DictReader,
+    fields past the header's length (e.g. trailing commas) are ignored and
+    missing trailing fields read as empty.
+    """
+    read_options = {"dtype": str, "na_filter": False, "index_col": False}
+    with warnings.catch_warnings():
+        # index_col=False warns whenever it drops the extra fields
+        warnings.simplefilter("ignore", pd.errors.ParserWarning)
+        try:
+            # The C tokenizer splits the file; everything stays text so values
+            # reach validation exactly as written
+            return pd.read_csv(StringIO(csv_content), **read_options)
+        except pd.errors.ParserError:
+            pass
+
+        # The C engine rejects a file with any row longer than the header
+        # past its first row; the python engine can truncate those rows
+        header = next((row for row in csv.reader(StringIO(csv_content)) if row), [])
+        frame = pd.read_csv(
+            StringIO(csv_content),
+            engine="python",
+            on_bad_lines=lambda fields: fields[:len(header)],
+            **read_options,
+        )
+    # The python engine pads short rows with NaN even without na_filter
+    return frame.fillna("")
+
+
+def _parse_trades_csv(csv_content: str, user_id: str) -> Tuple[List[Dict], List[str]]:
+    """
+    Parse an uploaded trades CSV column by column.
+
+    Returns:
+        Tuple of (trades-table mappings for the valid rows, one error per skipped row)
+    """
+    if not csv_content.strip():
+        return [], []
+
+    frame = _read_csv_text(csv_content)
+    if frame.empty:
+        return [], []
+
+    # pandas renames repeated header names ("x.1"); like csv.DictReader, let
+    # the last column of a name win
+    header = next((row for row in csv.reader(StringIO(csv_content)) if row), [])
+    if len(header) == frame.shape[1] and len(set(header)) < len(header):
+        last_positions = sorted({name: i for i, name in enumerate(header)}.values())
+        frame = frame.iloc[:, last_positions]
+        frame.columns = [header[i] for i in last_positions]
+
+    entry_time_str = [v.strip() for v in _csv_column(frame, "entry_time", "date")]
+    exit_time_str = [v.strip() for v in _csv_column(frame, "exit_time")]
+    symbol = [v.strip() for v in _csv_column(frame, "symbol")]
+    side = [v.strip().upper() for v in _csv_column(frame, "side")]
+    notes = [v.strip() or None for v in _csv_column(frame, "notes")]
+    exchange = [v.strip() or None for v in _csv_column(frame, "exchange")]
+
+    # Optional numeric fields are only parsed when given
+    leverage_raw = _csv_column(frame, "leverage")
+    fees_raw = _csv_column(frame, "fees")
+    pnl_raw = _csv_column(frame, "pnl_usd")
+    pnl_pct_present = [
+        bool(a or b) for a, b in zip(_csv_column(frame, "pnl_percent"), _csv_column(frame, "pnl_pct"))
+    ]
+    numeric_columns = [
+        _parse_column(_csv_column(frame, "entry_price", "entry", default="0"), float),
+        _parse_column(_csv_column(frame, "exit_price", "exit", default="0"), float),
+        _parse_column(_csv_column(frame, "quantity", "size", default="0"), float),
+        _parse_column(leverage_raw, float, [bool(v) for v in leverage_raw]),
+        _parse_column(fees_raw, float, [bool(v) for v in fees_raw]),
+        _parse_column(pnl_raw, float, [bool(v) for v in pnl_raw]),
+        _parse_column(_csv_column(frame, "pnl_percent", "pnl_pct"), float, pnl_pct_present),
+    ]
+    entry_price, exit_price, quantity, leverage, fees, pnl_usd, pnl_percent = (
+        values for values, _ in numeric_columns
+    )
+    # First failing numeric field of each row, in the order the fields are read
+    numeric_error = [None] * len(frame)
+    for _, column_errors in reversed(numeric_columns):
+        numeric_error = [e if e is not None else prev for e, prev in zip(column_errors, numeric_error)]
+
+    # Timestamps parse column-wise too; empty ones are left to the required
+    # field check (entry) or skipped (exit)
+    entry_time, entry_time_error = _parse_column(
+        entry_time_str, datetime.fromisoformat, [bool(v) for v in entry_time_str]
+    )
+    _, exit_time_error = _parse_column(
+        exit_time_str, datetime.fromisoformat, [bool(v) for v in exit_time_str]
+    )
+
+    rows = []
+    errors = []
+    for (
+        row_idx, numeric_err, entry_str, entry_time_v, entry_time_err, exit_str, exit_time_err,
+        symbol_v, side_v, entry_v, exit_v, size_v, leverage_v, fees_v, pnl_v, pnl_pct_v,
+        notes_v, exchange_v,
+    ) in zip(
+        range(2, len(frame) + 2),  # Row 1 is the header
+        numeric_error, entry_time_str, entry_time, entry_time_error, exit_time_str, exit_time_error,
+        symbol, side, entry_price, exit_price, quantity, leverage, fees, pnl_usd, pnl_percent,
+        notes, exchange,
+    ):
+        if numeric_err is not None:
+            errors.append(f"Row {row_idx}: {numeric_err}")
+            continue
+
+        # Validate required fields
+        if not (entry_str and symbol_v and side_v and entry_v and size_v):
+            errors.append(f"Row {row_idx}: Missing required fields")
+            continue
+
+        if entry_time_err is not None:
+            errors.append(f"Row {row_idx}: Invalid entry_time format: {entry_str}")
+            continue
+
+        # trades has no exit time column; the value is only validated
+        if exit_time_err is not None:
+            logger.warning(f"Row {row_idx}: Invalid exit_time format: {exit_str}")
+
+        # Plain mappings onto the trades columns for the bulk insert
+        rows.append({
+            "id": new_trade_id(),
+            "user_id": user_id,
+            "symbol": symbol_v,
+            "side": side_v,
+            "entry": entry_v,
+            "exit": exit_v if exit_v > 0 else None,
+            "date": entry_time_v,
+            "size": size_v,
+            "leverage": leverage_v,
+            "fees": fees_v,
+            "pnl_usd": pnl_v,
+            "pnl_pct": pnl_pct_v,
+            "notes": notes_v,
+            "exchange": exchange_v,
+        })
+
+    return rows, errors
+
+
 class CoachService:
     """Service for managing trading coach conversations and responses."""
 
+    # Live services, so trade writes outside the coach (exchange syncs,
+    # manual trades) can drop what they cached from a user's trades
+    _instances: "weakref.WeakSet[CoachService]" = weakref.WeakSet()
+
     def __init__(self):
         try:
             self.llm = ClaudeService()
@@ -62,9 +268,75 @@ class CoachService:
 
         self.supabase = SupabaseClient()
         self.memory_extractor = MemoryExtractor()
+        # Shared by all requests so concurrent extractions are coalesced
+        self.extraction_batcher = MemoryExtractionBatcher(self.memory_extractor)
         self.memory_manager = MemoryManager()
         self.progress_tracker = ProgressTracker()
         self.context_builder = ContextBuilder()
+        self.response_cache = SemanticResponseCache()
+        # (kind, user_id, ...) -> (expires_at, value), least recently used first
+        self._conversation_cache: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        # Bumped on every write so reads that started before it aren't cached
+        self._conversation_generation: Dict[str, int] = {}
+        # References keep running extractions from being garbage collected
+        self._extraction_semaphore = asyncio.Semaphore(MAX_CONCURRENT_EXTRACTIONS)
+        self._background_tasks: "set[asyncio.Task]" = set()
+        CoachService._instances.add(self)
+
+    @classmethod
+    def invalidate_user_trades(cls, user_id: str) -> None:
+        """Drop the context and responses cached for a user whose trades were written elsewhere"""
+        for service in list(cls._instances):
+            service.context_builder.invalidate_user_context(user_id)
+            service.response_cache.invalidate(user_id)
+
+    def _conversation_cache_get(self, key: Tuple) -> Any:
+        cached = self._conversation_cache.get(key)
+        if cached is None:
+            return None
+        if time.monotonic() >= cached[0]:
+            del self._conversation_cache[key]
+            return None
+        self._conversation_cache.move_to_end(key)
+        return cached[1]
+
+    def _conversation_cache_put(self, key: Tuple, generation: int, value: Any) -> None:
+        if self._conversation_generation.get(key[1], 0) != generation:
+            return
+        self._conversation_cache[key] = (time.monotonic() + CONVERSATION_CACHE_TTL_SECONDS, value)
+        self._conversation_cache.move_to_end(key)
+        while len(self._conversation_cache) > CONVERSATION_CACHE_MAX_ENTRIES:
+            self._conversation_cache.popitem(last=False)
+
+    def _invalidate_conversations(self, user_id: str) -> None:
+        """Drop a user's cached conversations and conversation lists"""
+        self._conversation_generation[user_id] = self._conversation_generation.get(user_id, 0) + 1
+        for key in [k for k in self._conversation_cache if k[1] == user_id]:
+            del self._conversation_cache[key]
+
+    async def _fetch_conversation(self, user_id: str, conversation_id: str) -> Dict:
+        """Supabase conversation with messages, cached per (user, conversation) for the read endpoints"""
+        key = ("conversation", user_id, conversation_id)
+        conversation = self._conversation_cache_get(key)
+        if conversation is None:
+            generation = self._conversation_generation.get(user_id, 0)
+            conversation = await self.supabase.get_conversation(conversation_id, user_id)
+            self._conversation_cache_put(key, generation, conversation)
+        return conversation
+
+    async def _fetch_conversation_list(
+        self, user_id: str, limit: int, offset: int, include_deleted: bool
+    ) -> Tuple[List[Dict], int]:
+        """Supabase conversation page and total count, cached per (user, limit, offset, include_deleted)"""
+        key = ("list", user_id, limit, offset, include_deleted)
+        page = self._conversation_cache_get(key)
+        if page is None:
+            generation = self._conversation_generation.get(user_id, 0)
+            page = await self.supabase.list_conversations(user_id, limit, offset, include_deleted)
+            # Failed fetches come back empty; don't pin them
+            if page[0]:
+                self._conversation_cache_put(key, generation, page)
+        return page
 
     async def create_conversation(self, user_id: str, db: Session) -> str:
         """
@@ -79,6 +351,7 @@ class CoachService:
         """
         try:
             result = await self.supabase.create_conversation(user_id)
+            self._invalidate_conversations(user_id)
             logger.info(f"Created conversation {result['id']} for user {user_id} in Supabase")
             return result["id"]
         except Exception as e:
@@ -105,44 +378,151 @@ class CoachService:
             ValueError: If conversation not found or doesn't belong to user
             RuntimeError: If LLM fails
         """
-        if not self.llm:
-            raise RuntimeError("AI Coach is not available. Anthropic API key not configured.")
+        metadata: Dict = {}
+        chunks = [
+            chunk
+            async for chunk in self._exchange(
+                user_id, conversation_id, user_message, db, metadata, stream=False
+            )
+        ]
+        return "".join(chunks), metadata
 
-        try:
-            # Get conversation from Supabase to verify it belongs to user
-            conversation = await self.supabase.get_conversation(conversation_id, user_id)
+    def send_message_stream(
+        self,
+        user_id: str,
+        conversation_id: str,
+        user_message: str,
+        db: Session,
+        metadata: Optional[Dict] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Send a message and stream the coach response as it is generated.
+        Both messages are stored in Supabase once the response is complete.
 
-            # Save user message to Supabase
-            user_msg_tokens = ClaudeService.estimate_tokens(user_message)
-            user_msg_obj = await self.supabase.add_message(
-                conversation_id=conversation_id,
-                role="user",
-                content=user_message,
-                tokens_input=user_msg_tokens,
-                tokens_output=0,
-            )
-            logger.info(f"User message saved to Supabase: {user_msg_obj['id']}")
+        Args:
+            user_id: User ID
+            conversation_id: Conversation ID
+            user_message: User's message text
+            db: Database session
+            metadata: Filled with the same response metadata as send_message
+                once the stream is exhausted
+
+        Returns:
+            Async iterator of response text chunks
+
+        Raises:
+            ValueError: If conversation not found or doesn't belong to user
+            RuntimeError: If LLM fails
+        """
+        return self._exchange(
+            user_id, conversation_id, user_message, db,
+            metadata if metadata is not None else {}, stream=True,
+        )
+
+    async def _exchange(
+        self,
+        user_id: str,
+        conversation_id: str,
+        user_message: str,
+        db: Session,
+        metadata: Dict,
+        stream: bool,
+    ) -> AsyncIterator[str]:
+        """
+        One user message and coach response. Yields the response (in chunks as
+        Claude generates it when `stream`, otherwise whole) and fills `metadata`.
+        """
+        if not self.llm:
+            raise RuntimeError("AI Coach is not available. Anthropic API key not configured.")
 
-            # Build user context with semantic search for relevance
-            # This now includes memories, goals, episodes, and related past conversations
-            context = await self.context_builder.get_relevant_context_for_message(
+        # Context building and the question embedding don't depend on the
+        # conversation, so they overlap with fetching it. The one embedding
+        # serves both the response cache and the context's semantic search
+        embedding_task = asyncio.create_task(self.response_cache.embed_raw(user_message))
+        context_task = asyncio.create_task(
+            self.context_builder.get_relevant_context_for_message(
                 user_id=user_id,
                 message=user_message,
                 db=db,
+                query_embedding=embedding_task,
+            )
+        )
+        user_msg_task = None
+
+        try:
+            # Get conversation from Supabase to verify it belongs to user.
+            # Read past the conversation cache: it is per instance, and the
+            # history sent to Claude must include messages written through
+            # other instances
+            conversation, raw_embedding = await asyncio.gather(
+                self.supabase.get_conversation(conversation_id, user_id),
+                embedding_task,
+            )
+            question_embedding = SemanticResponseCache.normalize(raw_embedding)
+
+            # Save user message to Supabase while the response is generated
+            user_msg_tokens = ClaudeService.estimate_tokens(user_message)
+            user_msg_task = asyncio.create_task(
+                self.supabase.add_message(
+                    conversation_id=conversation_id,
+                    role="user",
+                    content=user_message,
+                    tokens_input=user_msg_tokens,
+                    tokens_output=0,
+                )
             )
 
             # Format message history from Supabase messages
             message_history = [
                 {"role": msg["role"], "content": msg["content"]} for msg in conversation["messages"]
             ]
+
+            # Near-duplicate questions at the same point of a conversation
+            # reuse the earlier answer and skip context building and Claude
+            history_fingerprint = SemanticResponseCache.fingerprint(message_history)
+            cached_response = None
+            if question_embedding is not None:
+                cached_response = self.response_cache.lookup(user_id, question_embedding, history_fingerprint)
+
             message_history.append({"role": "user", "content": user_message})
 
-            # Get coach response from Claude (system prompt and context handled internally)
-            response_text, input_tokens, output_tokens = await self.llm.get_coach_response(
-                system_prompt=None,  # Use ClaudeService's built-in elite coach prompt
-                messages=message_history,
-                user_context=context,  # Pass context directly, ClaudeService formats it
-            )
+            if cached_response is not None:
+                context_task.cancel()
+                response_text, input_tokens, output_tokens = cached_response, 0, 0
+                yield response_text
+            else:
+                # Build user context with semantic search for relevance
+                # This now includes memories, goals, episodes, and related past conversations
+                context = await context_task
+
+                # Get coach response from Claude (system prompt and context handled internally)
+                if stream:
+                    chunks: List[str] = []
+                    usage: Dict = {}
+                    async for chunk in self.llm.get_streaming_response(
+                        system_prompt=None,
+                        messages=message_history,
+                        user_context=context,
+                        usage=usage,
+                    ):
+                        chunks.append(chunk)
+                        yield chunk
+                    response_text = "".join(chunks)
+                    input_tokens = usage.get("input_tokens", 0)
+                    output_tokens = usage.get("output_tokens", 0)
+                else:
+                    response_text, input_tokens, output_tokens = await self.llm.get_coach_response(
+                        system_prompt=None,  # Use ClaudeService's built-in elite coach prompt
+                        messages=message_history,
+                        user_context=context,  # Pass context directly, ClaudeService formats it
+                    )
+                    yield response_text
+
+                if question_embedding is not None:
+                    self.response_cache.store(user_id, question_embedding, history_fingerprint, response_text)
+
+            user_msg_obj = await user_msg_task
+            logger.info(f"User message saved to Supabase: {user_msg_obj['id']}")
 
             # Save assistant response to Supabase
             assistant_msg_obj = await self.supabase.add_message(
@@ -157,29 +537,40 @@ class CoachService:
             # Calculate cost
             cost = ClaudeService.calculate_cost(input_tokens, output_tokens)
 
-            # Trigger memory extraction in background (don't wait for it)
-            asyncio.create_task(
-                self._extract_memories_from_exchange(
+            # Trigger memory extraction in background (don't wait for it).
+            # A cached answer repeats an exchange that was already extracted
+            if cached_response is None:
+                self._start_extraction(
                     user_id=user_id,
                     conversation_id=conversation_id,
                     user_message=user_message,
                     coach_response=response_text,
                     context=context,
                 )
-            )
 
-            return response_text, {
+            metadata.update({
                 "message_id": assistant_msg_obj["id"],
                 "tokens_used": {
                     "input": input_tokens,
                     "output": output_tokens,
                 },
                 "cost_usd": round(cost, 6),
-            }
+                "cached": cached_response is not None,
+            })
 
         except Exception as e:
             logger.error(f"Error sending message: {e}")
             raise
+        finally:
+            if user_msg_task is not None:
+                self._invalidate_conversations(user_id)
+            for task in (embedding_task, context_task, user_msg_task):
+                if task is None:
+                    continue
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # already reported through the failure above
 
     async def get_conversation(self, user_id: str, conversation_id: str, db: Session) -> Dict:
         """
@@ -194,9 +585,17 @@ class CoachService:
             Conversation dictionary with messages
         """
         try:
-            conversation = await self.supabase.get_conversation(conversation_id, user_id)
+            # The shaped response is cached next to the raw conversation and
+            # invalidated with it, so repeat reads skip the per-message work
+            key = ("conversation_response", user_id, conversation_id)
+            cached = self._conversation_cache_get(key)
+            if cached is not None:
+                return cached
 
-            return {
+            generation = self._conversation_generation.get(user_id, 0)
+            conversation = await self._fetch_conversation(user_id, conversation_id)
+
+            response = {
                 "id": conversation["id"],
                 "title": conversation.get("title") or "Untitled",
                 "created_at": conversation["created_at"],
@@ -216,6 +615,8 @@ class CoachService:
                     for msg in conversation.get("messages", [])
                 ],
             }
+            self._conversation_cache_put(key, generation, response)
+            return response
 
         except Exception as e:
             logger.error(f"Error getting conversation: {e}")
@@ -238,11 +639,10 @@ class CoachService:
             Dictionary with conversations list and total count
         """
         try:
-            conversations = await self.supabase.list_conversations(user_id, limit, offset)
-
-            # Filter out deleted conversations if needed
-            if not include_deleted:
-                conversations = [c for c in conversations if not c.get("deleted_at")]
+            # Soft-deleted conversations are filtered by Supabase unless requested
+            conversations, total = await self._fetch_conversation_list(
+                user_id, limit, offset, include_deleted
+            )
 
             return {
                 "conversations": [
@@ -256,7 +656,7 @@ class CoachService:
                     }
                     for c in conversations
                 ],
-                "total": len(conversations),
+                "total": total,
                 "limit": limit,
                 "offset": offset,
             }
@@ -279,6 +679,7 @@ class CoachService:
         """
         try:
             await self.supabase.delete_conversation(conversation_id, user_id)
+            self._invalidate_conversations(user_id)
             logger.info(f"Soft deleted conversation {conversation_id} in Supabase")
             return True
 
@@ -339,79 +740,18 @@ class CoachService:
             ValueError: If CSV format is invalid
         """
         try:
-            # Parse CSV
-            csv_reader = csv.DictReader(StringIO(csv_content))
-            trades_imported = 0
-            trades_skipped = 0
-            errors = []
-
-            for row_idx, row in enumerate(csv_reader, start=2):  # Start at 2 (header is row 1)
-                try:
-                    # Parse trade data (use new field names for Supabase)
-                    entry_time_str = row.get("entry_time", row.get("date", "")).strip()
-                    exit_time_str = row.get("exit_time", "").strip()
-                    symbol = row.get("symbol", "").strip()
-                    side = row.get("side", "").strip().upper()
-                    entry_price = float(row.get("entry_price", row.get("entry", 0)))
-                    exit_price = float(row.get("exit_price", row.get("exit", 0)))
-                    quantity = float(row.get("quantity", row.get("size", 0)))
-                    leverage = float(row.get("leverage", 1)) if row.get("leverage") else None
-                    fees = float(row.get("fees", 0)) if row.get("fees") else None
-                    pnl_usd = float(row.get("pnl_usd", 0)) if row.get("pnl_usd") else None
-                    pnl_percent = float(row.get("pnl_percent", row.get("pnl_pct", 0))) if row.get("pnl_percent") or row.get("pnl_pct") else None
-                    notes = row.get("notes", "").strip() or None
-                    exchange = row.get("exchange", "").strip() or None
-
-                    # Validate required fields
-                    if not all([entry_time_str, symbol, side, entry_price, quantity]):
-                        errors.append(f"Row {row_idx}: Missing required fields")
-                        trades_skipped += 1
-                        continue
-
-                    # Parse dates
-                    try:
-                        entry_time = datetime.fromisoformat(entry_time_str)
-                    except ValueError:
-                        errors.append(f"Row {row_idx}: Invalid entry_time format: {entry_time_str}")
-                        trades_skipped += 1
-                        continue
-
-                    exit_time = None
-                    if exit_time_str:
-                        try:
-                            exit_time = datetime.fromisoformat(exit_time_str)
-                        except ValueError:
-                            logger.warning(f"Row {row_idx}: Invalid exit_time format: {exit_time_str}")
-
-                    # Create trade in Supabase
-                    trade = Trade(
-                        id=str(uuid.uuid4()),
-                        user_id=user_id,
-                        symbol=symbol,
-                        side=side,
-                        entry_price=entry_price,
-                        exit_price=exit_price if exit_price > 0 else None,
-                        entry_time=entry_time,
-                        exit_time=exit_time,
-                        quantity=quantity,
-                        leverage=leverage,
-                        fees=fees,
-                        pnl_usd=pnl_usd,
-                        pnl_percent=pnl_percent,
-                        notes=notes,
-                        exchange=exchange,
-                        created_at=datetime.utcnow(),
-                        updated_at=datetime.utcnow(),
-                    )
-                    db.add(trade)
-                    trades_imported += 1
-
-                except (ValueError, KeyError) as e:
-                    errors.append(f"Row {row_idx}: {str(e)}")
-                    trades_skipped += 1
-                    continue
-
+            # Parse and validate the whole CSV column-wise
+            rows, errors = _parse_trades_csv(csv_content, user_id)
+            trades_imported = len(rows)
+            trades_skipped = len(errors)
+
+            # Core executemany skips ORM unit-of-work bookkeeping per row
+            trade_table = Trade.__table__
+            for start in range(0, len(rows), IMPORT_INSERT_CHUNK_SIZE):
+                db.execute(trade_table.insert(), rows[start:start + IMPORT_INSERT_CHUNK_SIZE])
             db.commit()
+            self.context_builder.invalidate_user_context(user_id)
+            self.response_cache.invalidate(user_id)
             logger.info(f"Imported {trades_imported} trades for user {user_id}")
 
             return {
@@ -426,6 +766,22 @@ class CoachService:
             db.rollback()
             raise
 
+    def _start_extraction(self, **exchange) -> None:
+        """Run _extract_memories_from_exchange in the background, bounded."""
+        if len(self._background_tasks) >= MAX_PENDING_EXTRACTIONS:
+            logger.warning(
+                f"Skipping memory extraction for {exchange['user_id']}: "
+                f"{len(self._background_tasks)} extractions pending"
+            )
+            return
+        task = asyncio.create_task(self._extract_when_free(**exchange))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _extract_when_free(self, **exchange) -> None:
+        async with self._extraction_semaphore:
+            await self._extract_memories_from_exchange(**exchange)
+
     async def _extract_memories_from_exchange(
         self,
         user_id: str,
@@ -451,8 +807,8 @@ class CoachService:
                 "recent_patterns": context.get("patterns", [])[:3],
             }
 
-            # Run extraction
-            result = await self.memory_extractor.extract_from_conversation(
+            # Run extraction, batched with other exchanges finishing around now
+            result = await self.extraction_batcher.extract(
                 user_id=user_id,
                 conversation_id=conversation_id,
                 messages=messages,
@@ -467,6 +823,8 @@ class CoachService:
                 memories_updated = len(result.get("memories_updated", []))
 
                 if memories_created or episodes_created or memories_updated:
+                    self.context_builder.invalidate_user_context(user_id)
+                    self.response_cache.invalidate(user_id)
                     logger.info(
                         f"Memory extraction for {user_id}: "
                         f"{memories_created} memories, "
@@ -552,6 +910,8 @@ class CoachService:
             )
 
             if goal:
+                self.context_builder.invalidate_user_context(user_id)
+                self.response_cache.invalidate(user_id)
                 return {
                     "id": goal.id,
                     "goal_type": goal.goal_type,
@@ -598,6 +958,8 @@ class CoachService:
             )
 
             if success:
+                self.context_builder.invalidate_user_context(user_id)
+                self.response_cache.invalidate(user_id)
                 return {"success": True, "goal_id": goal_id}
 
             return {"error": "Failed to update goal"}
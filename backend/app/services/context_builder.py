@@ -6,7 +6,8 @@ Now includes persistent memory system for personalized coaching.
 """
 
 import logging
-from typing import Dict, List, Optional
+import time
+from typing import Awaitable, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 
@@ -17,6 +18,7 @@ from app.services.mistake_detector import MistakeDetector
 from app.services.memory_manager import MemoryManager
 from app.services.embedding_service import SemanticMemorySearch
 from app.services.journal_service import journal_service
+from app.services.claude_service import format_recent_trades
 
 logger = logging.getLogger(__name__)
 
@@ -32,12 +34,36 @@ class ContextBuilder:
     MAX_TRADES_FOR_PROMPT = 50
     MISTAKE_LOOKBACK_DAYS = 7
     PATTERN_MIN_CONFIDENCE = 0.6
+    # Trades, insights, goals and memories change on writes, not per chat
+    # message; the message-independent context is reused for this long
+    STABLE_CONTEXT_TTL_SECONDS = 300.0
 
     def __init__(self):
         self.pattern_detector = PatternDetector()
         self.mistake_detector = MistakeDetector()
         self.memory_manager = MemoryManager()
         self.semantic_search = SemanticMemorySearch()
+        # user_id -> (expires at, context from _build_context)
+        self._stable_context: Dict[str, Tuple[float, Dict]] = {}
+
+    def invalidate_user_context(self, user_id: str) -> None:
+        """Drop a user's cached context after their trades, goals or memories change."""
+        self._stable_context.pop(user_id, None)
+
+    async def _get_stable_context(self, user_id: str, db: Session) -> Dict:
+        """_build_context, cached per user for STABLE_CONTEXT_TTL_SECONDS."""
+        now = time.monotonic()
+        cached = self._stable_context.get(user_id)
+        if cached is not None and now < cached[0]:
+            return cached[1]
+
+        context = await self._build_context(user_id, db)
+        # Partial contexts from a failed build are retried next message
+        if "error" not in context:
+            for stale_user in [u for u, (expires_at, _) in self._stable_context.items() if now >= expires_at]:
+                del self._stable_context[stale_user]
+            self._stable_context[user_id] = (now + self.STABLE_CONTEXT_TTL_SECONDS, context)
+        return context
 
     @staticmethod
     async def build_user_context(user_id: str, db: Session) -> Dict:
@@ -101,10 +127,13 @@ class ContextBuilder:
             journal_context = await self._get_journal_context(user_id)
 
             # Compile context
+            prompt_trades = all_trades[:self.MAX_TRADES_FOR_PROMPT]  # Limit for prompt
             context = {
                 "user_id": user_id,
                 "statistics": stats,
-                "trades": all_trades[:self.MAX_TRADES_FOR_PROMPT],  # Limit for prompt
+                "trades": prompt_trades,
+                # Rendered once here instead of on every Claude call
+                "_formatted_trades_md": format_recent_trades(prompt_trades),
                 "all_trades_count": len(all_trades),
                 "patterns": patterns,
                 "recent_mistakes": recent_mistakes,
@@ -454,15 +483,24 @@ class ContextBuilder:
             return {}
 
     async def get_relevant_context_for_message(
-        self, user_id: str, message: str, db: Session
+        self,
+        user_id: str,
+        message: str,
+        db: Session,
+        query_embedding: Optional[Awaitable[Optional[List[float]]]] = None,
     ) -> Dict:
         """
         Get context specifically relevant to the current message.
-        Uses semantic search to find related past conversations and memories.
+        Uses semantic search to find related past conversations and memories;
+        only that part is computed per message.
+
+        `query_embedding` resolves to the message's embedding when the caller
+        computes one anyway; it is awaited after the base context is built,
+        so both can run concurrently.
         """
         try:
-            # Get base context
-            base_context = await self._build_context(user_id, db)
+            # Get base context (copied so per-message keys stay out of the cache)
+            base_context = dict(await self._get_stable_context(user_id, db))
 
             # Find semantically similar past conversations
             similar_context = await self.semantic_search.get_relevant_memories_for_query(
@@ -470,6 +508,7 @@ class ContextBuilder:
                 query=message,
                 include_conversations=True,
                 max_results=5,
+                query_embedding=await query_embedding if query_embedding is not None else None,
             )
 
             # Add to context
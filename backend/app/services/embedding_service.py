@@ -157,6 +157,7 @@ class EmbeddingService:
         query: str,
         limit: int = 10,
         min_similarity: float = 0.7,
+        query_embedding: Optional[List[float]] = None,
     ) -> List[Dict]:
         """
         Search for messages similar to the query.
@@ -166,6 +167,7 @@ class EmbeddingService:
             query: Search query text
             limit: Maximum results to return
             min_similarity: Minimum similarity threshold (0-1)
+            query_embedding: Embedding of `query` if the caller already has it
 
         Returns:
             List of similar messages with similarity scores
@@ -175,7 +177,8 @@ class EmbeddingService:
 
         try:
             # Generate embedding for the query
-            query_embedding = await self.generate_embedding(query)
+            if not query_embedding:
+                query_embedding = await self.generate_embedding(query)
             if not query_embedding:
                 return []
 
@@ -216,6 +219,7 @@ class EmbeddingService:
         user_id: str,
         current_message: str,
         limit: int = 5,
+        query_embedding: Optional[List[float]] = None,
     ) -> List[Dict]:
         """
         Find relevant past conversations for the current message.
@@ -225,6 +229,7 @@ class EmbeddingService:
             user_id: User ID
             current_message: The current user message
             limit: Maximum number of relevant contexts to return
+            query_embedding: Embedding of the message if already computed
 
         Returns:
             List of relevant past message contexts
@@ -234,6 +239,7 @@ class EmbeddingService:
             query=current_message,
             limit=limit,
             min_similarity=0.75,
+            query_embedding=query_embedding,
         )
 
         return similar
@@ -324,6 +330,7 @@ class SemanticMemorySearch:
         query: str,
         include_conversations: bool = True,
         max_results: int = 5,
+        query_embedding: Optional[List[float]] = None,
     ) -> Dict:
         """
         Get relevant memories and past conversations for a query.
@@ -333,6 +340,7 @@ class SemanticMemorySearch:
             query: The query to find relevant context for
             include_conversations: Whether to include past conversation snippets
             max_results: Maximum results per category
+            query_embedding: Embedding of the query if already computed
 
         Returns:
             Dict with relevant memories and conversations
@@ -352,6 +360,7 @@ class SemanticMemorySearch:
                 user_id=user_id,
                 current_message=query,
                 limit=max_results,
+                query_embedding=query_embedding,
             )
             result["relevant_conversations"] = similar
 
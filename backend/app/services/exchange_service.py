@@ -223,23 +223,18 @@ class ExchangeService:
 
                 # CRITICAL: Aggregate fills by orderId to group partial fills into complete trades
                 # Blofin returns individual fills, not complete trades
-                from app.services.blofin_client import aggregate_fills_by_order, calculate_trade_fields
+                from app.services.blofin_client import aggregate_fills_by_order, calculate_trade_fields_batch
                 aggregated_fills = aggregate_fills_by_order(all_fills)
                 print(f"✅ Aggregated {len(all_fills)} fills into {len(aggregated_fills)} complete trades")
 
-                # Calculate trade fields for all aggregated trades
+                # Calculate trade fields for all aggregated trades in one vectorized pass
                 calculated_trades = []
-                for fill in aggregated_fills:
-                    try:
-                        trade = calculate_trade_fields(fill)
-                        # Skip invalid trades (returns None if entry price <= 0)
-                        if trade is not None:
-                            calculated_trades.append(trade)
-                        else:
-                            print(f"⏭️ Skipped invalid trade (entry price <= 0)")
-                    except Exception as e:
-                        print(f"⚠️ Failed to process trade: {e}")
-                        continue
+                for trade in calculate_trade_fields_batch(aggregated_fills):
+                    # Skip invalid trades (None if entry price == 0 or the fill is malformed)
+                    if trade is not None:
+                        calculated_trades.append(trade)
+                    else:
+                        print(f"⏭️ Skipped invalid trade")
 
                 print(f"✅ Successfully calculated fields for {len(calculated_trades)} trades")
 
@@ -7,10 +7,12 @@ After each conversation, this service analyzes what was discussed and:
 - Logs what was learned for transparency
 """
 
+import asyncio
 import logging
 import os
 import json
-from typing import List, Dict, Optional, Any
+import secrets
+from typing import List, Dict, Optional, Any, Tuple
 from datetime import datetime
 import httpx
 
@@ -77,6 +79,13 @@ Return JSON in this exact format:
 If nothing significant was learned, return empty arrays.
 """
 
+    BATCH_INSTRUCTIONS = """You will analyze {count} separate conversations, each marked "=== CONVERSATION <ref> ===" and
+each with its own trader, existing knowledge and trading context. Treat them independently: never
+carry a learning from one conversation over to another.
+
+Return a JSON array with exactly {count} objects, one per conversation, each in the format above
+plus a "conversation_ref" field holding that conversation's <ref> exactly as written in its marker."""
+
     def __init__(self):
         self.anthropic_key = os.getenv("ANTHROPIC_API_KEY", "")
         self.memory_manager = MemoryManager()
@@ -111,12 +120,8 @@ If nothing significant was learned, return empty arrays.
             return {"memories": [], "episodes": [], "updates": []}
 
         try:
-            # Format conversation for analysis
-            conversation_text = self._format_conversation(messages)
-
-            # Get existing memories for context
-            existing_memories = await self.memory_manager.get_memories(user_id)
-            existing_summary = self._summarize_existing_memories(existing_memories)
+            # Format conversation and existing memories for analysis
+            conversation_text, existing_summary = await self._prepare_extraction(user_id, messages)
 
             # Build the extraction prompt
             full_prompt = self._build_extraction_prompt(
@@ -126,27 +131,127 @@ If nothing significant was learned, return empty arrays.
             # Call Claude to extract learnings
             extraction_result = await self._call_claude_for_extraction(full_prompt)
 
-            if not extraction_result:
-                return {"memories": [], "episodes": [], "updates": []}
+            return await self._apply_extraction(user_id, conversation_id, messages, extraction_result)
 
-            # Process the extracted learnings
-            result = await self._process_extractions(
-                user_id, conversation_id, extraction_result
-            )
+        except Exception as e:
+            logger.error(f"Error extracting memories: {e}")
+            return {"error": str(e)}
 
-            # Index messages for semantic search
-            await self._index_messages_for_search(
-                user_id, conversation_id, messages
-            )
+    async def extract_from_conversation_batch(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Extract memories from several conversations with a single Claude call.
 
-            # Log what was learned
-            await self._log_learning(user_id, conversation_id, result)
+        Args:
+            items: Keyword arguments of extract_from_conversation, one dict per conversation
 
-            return result
+        Returns:
+            One result per item, in order, as extract_from_conversation returns them
+        """
+        if len(items) == 1 or not self.anthropic_key:
+            return [await self.extract_from_conversation(**item) for item in items]
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        batched = []
+        for i, item in enumerate(items):
+            if not item["messages"] or len(item["messages"]) < 2:
+                results[i] = {"memories": [], "episodes": [], "updates": []}
+            else:
+                batched.append(i)
+
+        if batched:
+            try:
+                prepared = await asyncio.gather(*(
+                    self._prepare_extraction(items[i]["user_id"], items[i]["messages"])
+                    for i in batched
+                ))
+                # Conversations of different users share the prompt, so each
+                # answer must name its conversation by a reference the model
+                # can't produce by counting
+                refs = [secrets.token_hex(4) for _ in batched]
+                prompt = self._build_batch_extraction_prompt([
+                    (ref, conversation_text, existing_summary, items[i].get("user_context"))
+                    for ref, i, (conversation_text, existing_summary) in zip(refs, batched, prepared)
+                ])
+                extractions = self._match_batch_extractions(
+                    refs,
+                    await self._call_claude_for_extraction(
+                        prompt, max_tokens=min(2000 * len(batched), 16000)
+                    ),
+                )
+            except Exception as e:
+                logger.error(f"Error preparing batched memory extraction: {e}")
+                extractions = None
 
-        except Exception as e:
-            logger.error(f"Error extracting memories: {e}")
-            return {"error": str(e)}
+            if extractions is not None:
+                applied = await asyncio.gather(*(
+                    self._apply_extraction(
+                        items[i]["user_id"], items[i]["conversation_id"], items[i]["messages"], extraction
+                    )
+                    for i, extraction in zip(batched, extractions)
+                ), return_exceptions=True)
+                for i, result in zip(batched, applied):
+                    if isinstance(result, Exception):
+                        logger.error(f"Error extracting memories: {result}")
+                        result = {"error": str(result)}
+                    results[i] = result
+            else:
+                # The batched answer can't be attributed to conversations
+                logger.warning(f"Batched memory extraction unusable, extracting {len(batched)} conversations one by one")
+                singles = await asyncio.gather(*(self.extract_from_conversation(**items[i]) for i in batched))
+                for i, result in zip(batched, singles):
+                    results[i] = result
+
+        return results
+
+    @staticmethod
+    def _match_batch_extractions(refs: List[str], extractions: Any) -> Optional[List[Dict]]:
+        """
+        Batched extraction results reordered to match `refs`, or None unless
+        every reference is answered by exactly one object.
+        """
+        if not isinstance(extractions, list) or len(extractions) != len(refs):
+            return None
+        by_ref = {}
+        for extraction in extractions:
+            if not isinstance(extraction, dict):
+                return None
+            ref = extraction.pop("conversation_ref", None)
+            if ref not in refs or ref in by_ref:
+                return None
+            by_ref[ref] = extraction
+        return [by_ref[ref] for ref in refs]
+
+    async def _prepare_extraction(self, user_id: str, messages: List[Dict[str, str]]) -> Tuple[str, str]:
+        """Conversation transcript and a summary of the user's existing memories."""
+        conversation_text = self._format_conversation(messages)
+        existing_memories = await self.memory_manager.get_memories(user_id)
+        return conversation_text, self._summarize_existing_memories(existing_memories)
+
+    async def _apply_extraction(
+        self,
+        user_id: str,
+        conversation_id: str,
+        messages: List[Dict[str, str]],
+        extraction_result: Optional[Dict],
+    ) -> Dict[str, Any]:
+        """Store the learnings Claude extracted from one conversation."""
+        if not extraction_result or not isinstance(extraction_result, dict):
+            return {"memories": [], "episodes": [], "updates": []}
+
+        # Process the extracted learnings
+        result = await self._process_extractions(
+            user_id, conversation_id, extraction_result
+        )
+
+        # Index messages for semantic search
+        await self._index_messages_for_search(
+            user_id, conversation_id, messages
+        )
+
+        # Log what was learned
+        await self._log_learning(user_id, conversation_id, result)
+
+        return result
 
     def _format_conversation(self, messages: List[Dict[str, str]]) -> str:
         """Format messages into a readable conversation transcript."""
@@ -197,7 +302,32 @@ CONVERSATION TO ANALYZE:
 
 Extract all learnable information and return as JSON:"""
 
-    async def _call_claude_for_extraction(self, prompt: str) -> Optional[Dict]:
+    def _build_batch_extraction_prompt(
+        self, conversations: List[Tuple[str, str, str, Optional[Dict]]]
+    ) -> str:
+        """Build one extraction prompt covering several (ref, transcript, memories, context) conversations."""
+        sections = []
+        for ref, conversation_text, existing_summary, user_context in conversations:
+            context_section = ""
+            if user_context:
+                context_section = f"\n\nTrading Context:\n{json.dumps(user_context, indent=2)}"
+            sections.append(f"""=== CONVERSATION {ref} ===
+
+{existing_summary}
+{context_section}
+
+CONVERSATION TO ANALYZE:
+{conversation_text}""")
+
+        conversations_text = "\n\n".join(sections)
+        return f"""{self.EXTRACTION_PROMPT}
+{self.BATCH_INSTRUCTIONS.format(count=len(conversations))}
+
+{conversations_text}
+
+Extract all learnable information from each conversation and return the JSON array:"""
+
+    async def _call_claude_for_extraction(self, prompt: str, max_tokens: int = 2000) -> Optional[Any]:
         """Call Claude API to extract memories from conversation."""
         try:
             async with httpx.AsyncClient() as client:
@@ -205,7 +335,7 @@ Extract all learnable information and return as JSON:"""
                     "https://api.anthropic.com/v1/messages",
                     json={
                         "model": "claude-sonnet-4-20250514",
-                        "max_tokens": 2000,
+                        "max_tokens": max_tokens,
                         "messages": [{"role": "user", "content": prompt}],
                     },
                     headers={
@@ -213,7 +343,8 @@ Extract all learnable information and return as JSON:"""
                         "anthropic-version": "2023-06-01",
                         "Content-Type": "application/json",
                     },
-                    timeout=60.0,
+                    # Batched extractions generate proportionally longer answers
+                    timeout=60.0 * max(1, max_tokens // 4000),
                 )
 
                 if response.status_code != 200:
@@ -393,6 +524,77 @@ Extract all learnable information and return as JSON:"""
         )
 
 
+class MemoryExtractionBatcher:
+    """
+    Coalesces memory extractions requested at about the same time into one
+    batched Claude call. Extraction runs in the background, so waiting up to
+    MAX_WAIT_SECONDS for company costs nothing on the response path.
+    """
+
+    MAX_BATCH = 16
+    MAX_WAIT_SECONDS = 0.05
+
+    def __init__(self, extractor: MemoryExtractor):
+        self.extractor = extractor
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._batches: set = set()
+
+    async def extract(
+        self,
+        user_id: str,
+        conversation_id: str,
+        messages: List[Dict[str, str]],
+        user_context: Optional[Dict] = None,
+    ) -> Dict[str, Any]:
+        """Queue an extraction and wait for the result of its batch."""
+        if self._collector is None or self._collector.done():
+            self._queue = asyncio.Queue()
+            self._collector = asyncio.create_task(self._collect_batches())
+
+        future = asyncio.get_running_loop().create_future()
+        item = {
+            "user_id": user_id,
+            "conversation_id": conversation_id,
+            "messages": messages,
+            "user_context": user_context,
+        }
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect_batches(self) -> None:
+        """Drain the queue into batches of up to MAX_BATCH items."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.MAX_WAIT_SECONDS
+            while len(batch) < self.MAX_BATCH:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Batches run concurrently; the collector goes straight back to
+            # gathering the next one
+            task = asyncio.create_task(self._run_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        try:
+            results = await self.extractor.extract_from_conversation_batch([item for item, _ in batch])
+        except Exception as e:
+            logger.error(f"Error in batched memory extraction: {e}")
+            results = [{"error": str(e)}] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
 class TradeAnalysisExtractor:
     """
     Extracts learnings from trade analysis.
@@ -0,0 +1,132 @@
+"""
+SemanticResponseCache: Reuses coach responses for near-duplicate questions.
+A question hits the cache when its embedding is close enough to a question the
+same user asked before, at the same point of a conversation.
+"""
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.services.embedding_service import EmbeddingService
+
+logger = logging.getLogger(__name__)
+
+
+class _CachedResponse:
+    """One cached coach response and the question it answered."""
+
+    __slots__ = ("embedding", "fingerprint", "response_text", "created_at")
+
+    def __init__(self, embedding: np.ndarray, fingerprint: str, response_text: str):
+        self.embedding = embedding
+        self.fingerprint = fingerprint
+        self.response_text = response_text
+        self.created_at = time.monotonic()
+
+
+class SemanticResponseCache:
+    """In-process, per-user LRU cache of coach responses keyed by question embedding."""
+
+    # ada-002 similarities sit high even for unrelated text, so the threshold
+    # is stricter than for small local embedding models
+    SIMILARITY_THRESHOLD = 0.95
+    # Responses reflect the trader's data when they were generated
+    TTL_SECONDS = 900.0
+    MAX_ENTRIES_PER_USER = 64
+    MAX_USERS = 1024
+    # Messages of conversation history a cached response must share
+    FINGERPRINT_MESSAGES = 2
+
+    def __init__(self):
+        self.embedding_service = EmbeddingService()
+        self._entries: "OrderedDict[str, OrderedDict[int, _CachedResponse]]" = OrderedDict()
+        self._next_id = 0
+
+    @property
+    def available(self) -> bool:
+        return self.embedding_service.openai_available
+
+    async def embed_raw(self, text: str) -> Optional[List[float]]:
+        """
+        Embedding of a question as the embedding API returns it (so it can
+        also be reused for semantic search), or None when unavailable.
+        """
+        if not self.available:
+            return None
+        return await self.embedding_service.generate_embedding(text)
+
+    @staticmethod
+    def normalize(embedding: Optional[List[float]]) -> Optional[np.ndarray]:
+        """Unit-length vector of an embed_raw result, or None."""
+        if not embedding:
+            return None
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+    @classmethod
+    def fingerprint(cls, messages: List[Dict]) -> str:
+        """
+        Digest of the last messages of a conversation, so a response is only
+        reused where the question follows the same exchange.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for msg in messages[-cls.FINGERPRINT_MESSAGES:]:
+            digest.update(msg["role"].encode())
+            digest.update(b"\x00")
+            digest.update(msg["content"].encode())
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def lookup(self, user_id: str, embedding: np.ndarray, fingerprint: str) -> Optional[str]:
+        """
+        Cached response for the most similar earlier question, if it is similar
+        enough and was asked after the same conversation history.
+        """
+        entries = self._entries.get(user_id)
+        if not entries:
+            return None
+
+        now = time.monotonic()
+        for entry_id in [i for i, e in entries.items() if now - e.created_at >= self.TTL_SECONDS]:
+            del entries[entry_id]
+
+        # Most recently used first, so ties go to the freshest answer
+        candidates = [(i, e) for i, e in reversed(entries.items()) if e.fingerprint == fingerprint]
+        if not candidates:
+            return None
+
+        similarities = np.stack([e.embedding for _, e in candidates]) @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.SIMILARITY_THRESHOLD:
+            return None
+
+        entry_id, entry = candidates[best]
+        entries.move_to_end(entry_id)
+        self._entries.move_to_end(user_id)
+        logger.info("Coach response cache hit for %s (similarity %.3f)", user_id, similarities[best])
+        return entry.response_text
+
+    def invalidate(self, user_id: str) -> None:
+        """Forget a user's cached responses after their trades, goals or memories change."""
+        self._entries.pop(user_id, None)
+
+    def store(self, user_id: str, embedding: np.ndarray, fingerprint: str, response_text: str) -> None:
+        """Cache a response, evicting the user's least recently used entries."""
+        entries = self._entries.get(user_id)
+        if entries is None:
+            entries = self._entries[user_id] = OrderedDict()
+            if len(self._entries) > self.MAX_USERS:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(user_id)
+
+        entries[self._next_id] = _CachedResponse(embedding, fingerprint, response_text)
+        self._next_id += 1
+        while len(entries) > self.MAX_ENTRIES_PER_USER:
+            entries.popitem(last=False)
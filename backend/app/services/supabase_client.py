@@ -3,20 +3,30 @@ Supabase Client: Direct HTTP client for Supabase REST API
 Handles conversations, messages, and insights for the coach system
 """
 
+import asyncio
 import logging
 import os
 import httpx
 import json
 import uuid
-from typing import List, Dict, Optional
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Keep idle connections to Supabase open between requests so most calls skip
+# the TCP + TLS handshake
+KEEPALIVE_EXPIRY_SECONDS = 75.0
+
 
 class SupabaseClient:
     """Low-level Supabase REST API client for coach data"""
 
+    # Live clients, so their shared HTTP sessions can be closed on shutdown
+    _instances: "weakref.WeakSet[SupabaseClient]" = weakref.WeakSet()
+
     def __init__(self):
         self.url = os.getenv("SUPABASE_URL", "").rstrip("/")
         self.key = os.getenv("SUPABASE_KEY", "")
@@ -25,6 +35,62 @@ class SupabaseClient:
         if not self.available:
             logger.warning("Supabase credentials not configured")
 
+        self._http: Optional[httpx.AsyncClient] = None
+        self._http_loop: Optional[asyncio.AbstractEventLoop] = None
+        SupabaseClient._instances.add(self)
+
+    @asynccontextmanager
+    async def _session(self) -> AsyncIterator[httpx.AsyncClient]:
+        """
+        Shared HTTP/2 client with keep-alive. Connections belong to an event
+        loop, so a new client is created when called from a different loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._http.is_closed or self._http_loop is not loop:
+            if self._http is not None and not self._http.is_closed:
+                self._close_on_own_loop(self._http, self._http_loop)
+            self._http = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(
+                    max_keepalive_connections=20,
+                    max_connections=100,
+                    keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+                ),
+            )
+            self._http_loop = loop
+        yield self._http
+
+    @staticmethod
+    def _close_on_own_loop(
+        client: httpx.AsyncClient, loop: Optional[asyncio.AbstractEventLoop]
+    ) -> None:
+        """
+        Close a client replaced by one for another event loop. Its connections
+        can only be closed on the loop that opened them; once that loop has
+        stopped they are released with its sockets.
+        """
+        if loop is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP session, if this event loop owns it"""
+        client, self._http = self._http, None
+        if client is None or client.is_closed:
+            return
+        if self._http_loop is asyncio.get_running_loop():
+            await client.aclose()
+        else:
+            self._close_on_own_loop(client, self._http_loop)
+
+    @classmethod
+    async def aclose_all(cls) -> None:
+        """Close every client's shared HTTP session (application shutdown)"""
+        for instance in list(cls._instances):
+            try:
+                await instance.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing Supabase HTTP session: {e}")
+
     async def create_conversation(self, user_id: str, title: Optional[str] = None) -> Dict:
         """Create a new conversation for a user"""
         if not self.available:
@@ -38,7 +104,7 @@ class SupabaseClient:
                 "updated_at": datetime.utcnow().isoformat() + "Z",
             }
 
-            async with httpx.AsyncClient() as client:
+            async with self._session() as client:
                 response = await client.post(
                     f"{self.url}/rest/v1/conversations",
                     json=payload,
@@ -73,7 +139,7 @@ class SupabaseClient:
 
         try:
             # Fetch conversation
-            async with httpx.AsyncClient() as client:
+            async with self._session() as client:
                 conv_response = await client.get(
                     f"{self.url}/rest/v1/conversations?id=eq.{conversation_id}&user_id=eq.{user_id}",
                     headers={
@@ -129,35 +195,48 @@ class SupabaseClient:
             raise
 
     async def list_conversations(
-        self, user_id: str, limit: int = 20, offset: int = 0
-    ) -> List[Dict]:
-        """List user's conversations"""
+        self, user_id: str, limit: int = 20, offset: int = 0, include_deleted: bool = False
+    ) -> Tuple[List[Dict], int]:
+        """
+        List user's conversations, without soft-deleted ones unless `include_deleted`.
+        Returns the requested page and the matching total count, both from
+        one request (PostgREST reports the count in Content-Range).
+        """
         if not self.available:
             raise RuntimeError("Supabase not available")
 
         try:
-            async with httpx.AsyncClient() as client:
+            url = f"{self.url}/rest/v1/conversations?user_id=eq.{user_id}&order=created_at.desc&limit={limit}&offset={offset}"
+            if not include_deleted:
+                url += "&deleted_at=is.null"
+
+            async with self._session() as client:
                 response = await client.get(
-                    f"{self.url}/rest/v1/conversations?user_id=eq.{user_id}&order=created_at.desc&limit={limit}&offset={offset}",
+                    url,
                     headers={
                         "apikey": self.key,
                         "Authorization": f"Bearer {self.key}",
                         "Content-Type": "application/json",
+                        "Prefer": "count=exact",
                     },
                     timeout=10.0,
                 )
 
-                if response.status_code != 200:
+                # 206 when the page is smaller than the total
+                if response.status_code not in (200, 206):
                     logger.error(
                         f"Failed to list conversations: {response.status_code} {response.text}"
                     )
-                    return []
+                    return [], 0
 
-                return response.json()
+                conversations = response.json()
+                # "0-19/57", or "*/0" when there are no rows
+                total = response.headers.get("content-range", "").rpartition("/")[2]
+                return conversations, int(total) if total.isdigit() else len(conversations)
 
         except Exception as e:
             logger.error(f"Error listing conversations: {e}", exc_info=True)
-            return []
+            return [], 0
 
     async def add_message(
         self, conversation_id: str, role: str, content: str, tokens_input: int = 0, tokens_output: int = 0
@@ -176,7 +255,7 @@ class SupabaseClient:
                 "created_at": datetime.utcnow().isoformat() + "Z",
             }
 
-            async with httpx.AsyncClient() as client:
+            async with self._session() as client:
                 response = await client.post(
                     f"{self.url}/rest/v1/messages",
                     json=payload,
@@ -210,7 +289,7 @@ class SupabaseClient:
             raise RuntimeError("Supabase not available")
 
         try:
-            async with httpx.AsyncClient() as client:
+            async with self._session() as client:
                 response = await client.patch(
                     f"{self.url}/rest/v1/conversations?id=eq.{conversation_id}&user_id=eq.{user_id}",
                     json={
@@ -248,7 +327,7 @@ class SupabaseClient:
                 "last_updated": datetime.utcnow().isoformat() + "Z",
             }
 
-            async with httpx.AsyncClient() as client:
+            async with self._session() as client:
                 response = await client.post(
                     f"{self.url}/rest/v1/coach_insights?on_conflict=user_id",
                     json=payload,
@@ -281,7 +360,7 @@ class SupabaseClient:
             return None
 
         try:
-            async with httpx.AsyncClient() as client:
+            async with self._session() as client:
                 response = await client.get(
                     f"{self.url}/rest/v1/coach_insights?user_id=eq.{user_id}",
                     headers={
@@ -322,7 +401,7 @@ class SupabaseClient:
                 "created_at": insight_data.get("created_at", datetime.utcnow().isoformat() + "Z"),
             }
 
-            async with httpx.AsyncClient() as client:
+            async with self._session() as client:
                 response = await client.post(
                     f"{self.url}/rest/v1/proactive_insights",
                     json=payload,
@@ -362,7 +441,7 @@ class SupabaseClient:
             if unread_only:
                 url += "&is_read=eq.false"
 
-            async with httpx.AsyncClient() as client:
+            async with self._session() as client:
                 response = await client.get(
                     url,
                     headers={
@@ -393,7 +472,7 @@ class SupabaseClient:
             raise RuntimeError("Supabase not available")
 
         try:
-            async with httpx.AsyncClient() as client:
+            async with self._session() as client:
                 response = await client.patch(
                     f"{self.url}/rest/v1/proactive_insights?id=eq.{insight_id}&user_id=eq.{user_id}",
                     json=update_data,
@@ -423,7 +502,7 @@ class SupabaseClient:
             raise RuntimeError("Supabase not available")
 
         try:
-            async with httpx.AsyncClient() as client:
+            async with self._session() as client:
                 response = await client.delete(
                     f"{self.url}/rest/v1/proactive_insights?id=eq.{insight_id}&user_id=eq.{user_id}",
                     headers={
@@ -456,7 +535,7 @@ class SupabaseClient:
             return None
 
         try:
-            async with httpx.AsyncClient() as client:
+            async with self._session() as client:
                 response = await client.get(
                     f"{self.url}/rest/v1/notification_preferences?user_id=eq.{user_id}",
                     headers={
@@ -496,7 +575,7 @@ class SupabaseClient:
                 "updated_at": datetime.utcnow().isoformat() + "Z",
             }
 
-            async with httpx.AsyncClient() as client:
+            async with self._session() as client:
                 response = await client.post(
                     f"{self.url}/rest/v1/notification_preferences",
                     json=payload,
@@ -539,7 +618,7 @@ class SupabaseClient:
                 "created_at": datetime.utcnow().isoformat() + "Z",
             }
 
-            async with httpx.AsyncClient() as client:
+            async with self._session() as client:
                 response = await client.post(
                     f"{self.url}/rest/v1/trading_reports",
                     json=payload,
@@ -579,7 +658,7 @@ class SupabaseClient:
             if report_type:
                 url += f"&report_type=eq.{report_type}"
 
-            async with httpx.AsyncClient() as client:
+            async with self._session() as client:
                 response = await client.get(
                     url,
                     headers={
@@ -610,7 +689,7 @@ class SupabaseClient:
             return []
 
         try:
-            conversations = await self.list_conversations(user_id, limit)
+            conversations, _ = await self.list_conversations(user_id, limit)
 
             result = []
             for conv in conversations:
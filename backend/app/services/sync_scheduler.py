@@ -14,6 +14,7 @@ from app.db import SessionLocal
 from app.models import ExchangeConnection
 from app.services.encryption import decrypt_secret
 from app.services.exchange_service import ExchangeService
+from app.services.coach_service import CoachService
 import asyncio
 
 # Set up logging
@@ -198,16 +199,15 @@ async def _sync_connection(connection_id: str, exchange_name: str, api_key: str,
             return
 
         # Deduplicate trades
-        from app.models import Trade
+        from app.models import Trade, new_trade_id
         unique_trades = exchange_service.deduplicate_trades(fetched_trades, user_id, exchange_name, db)
         logger.info(f"After deduplication: {len(unique_trades)} new trades to import")
 
         # Save trades to database
-        import uuid
         for trade_data in unique_trades:
             try:
                 new_trade = Trade(
-                    id=str(uuid.uuid4()),
+                    id=new_trade_id(),
                     user_id=user_id,
                     date=trade_data.get('date'),
                     symbol=trade_data.get('symbol'),
@@ -232,6 +232,7 @@ async def _sync_connection(connection_id: str, exchange_name: str, api_key: str,
         # Commit all trades
         if trades_imported > 0:
             db.commit()
+            CoachService.invalidate_user_trades(user_id)
             logger.info(f"Successfully imported {trades_imported} trades")
 
         # Update sync status to success
@@ -0,0 +1,23 @@
+"""
+Timestamp formatting shared by the exchange clients
+"""
+
+import functools
+import time
+
+
+@functools.lru_cache(maxsize=4096)
+def iso_from_ms(ts_ms: int) -> str:
+    """
+    Format epoch milliseconds like datetime.utcfromtimestamp(...).isoformat() + "Z"
+    without building a datetime. Fills and records of one position often
+    share timestamps, hence the cache.
+    """
+    t = time.gmtime(ts_ms // 1000)
+    ms_frac = ts_ms % 1000
+    # isoformat() drops a zero fraction and otherwise prints microseconds
+    fraction = f".{ms_frac:03d}000" if ms_frac else ""
+    return (
+        f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}"
+        f"T{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}{fraction}Z"
+    )
@@ -2,12 +2,15 @@ from __future__ import annotations
 
 from typing import Any, Dict, List
 
+import numpy as np
+
 from app.indicators import compute_rsi
 
 
-def run_strategy(candles: List[Dict[str, Any]]) -> Dict[str, Any]:
+def run_strategy(candles: Dict[str, np.ndarray]) -> Dict[str, Any]:
     """Run a basic mean reversion strategy using RSI(14)."""
-    if not candles:
+    closes = candles["close"]
+    if len(closes) == 0:
         return {
             "trades": [],
             "pnl_curve": [],
@@ -19,76 +22,58 @@ def run_strategy(candles: List[Dict[str, Any]]) -> Dict[str, Any]:
             },
         }
 
-    closes = [float(candle["close"]) for candle in candles]
-    rsis = compute_rsi(closes, period=14)
-
-    trades: List[Dict[str, Any]] = []
-    pnl_curve: List[float] = []
-    running_pnl = 0.0
-    peak = 0.0
-    max_drawdown = 0.0
+    timestamps = candles["timestamp"]
+    # None (warm-up) becomes NaN, which compares False against both thresholds
+    rsis = np.array(compute_rsi(closes.tolist(), length=14), dtype=np.float64)
 
-    position: Dict[str, Any] | None = None
+    # Enter long when RSI < 30, exit when RSI > 70. Both can't fire on the
+    # same bar, so positions simply alternate between the two signal sets.
+    entry_signals = np.flatnonzero(rsis < 30)
+    exit_signals = np.flatnonzero(rsis > 70)
 
-    for idx, candle in enumerate(candles):
-        rsi_value = rsis[idx]
-        close_price = float(candle["close"])
-        timestamp = candle.get("timestamp")
+    entry_idx: List[int] = []
+    exit_idx: List[int] = []
+    pos = 0
+    while pos < len(entry_signals):
+        entry = entry_signals[pos]
+        exit_pos = np.searchsorted(exit_signals, entry, side="right")
+        entry_idx.append(entry)
+        if exit_pos == len(exit_signals):
+            # Mark-to-market exit on last candle
+            exit_idx.append(len(closes) - 1)
+            break
+        exit_ = exit_signals[exit_pos]
+        exit_idx.append(exit_)
+        pos = np.searchsorted(entry_signals, exit_, side="right")
 
-        if position and rsi_value is not None and rsi_value > 70:
-            pnl = close_price - position["entry_price"]
-            running_pnl += pnl
-            trades.append(
-                {
-                    "entry_time": position["entry_time"],
-                    "entry_price": position["entry_price"],
-                    "exit_time": timestamp,
-                    "exit_price": close_price,
-                    "pnl": pnl,
-                }
-            )
-            position = None
+    entries = np.asarray(entry_idx, dtype=np.intp)
+    exits = np.asarray(exit_idx, dtype=np.intp)
+    pnls = closes[exits] - closes[entries]
 
-        if position is None and rsi_value is not None and rsi_value < 30:
-            position = {
-                "entry_time": timestamp,
-                "entry_price": close_price,
-            }
+    # Realized PnL steps at each exit bar; running max from 0 gives drawdown
+    pnl_steps = np.zeros(len(closes))
+    np.add.at(pnl_steps, exits, pnls)
+    pnl_curve = np.cumsum(pnl_steps)
+    peak = np.maximum.accumulate(np.maximum(pnl_curve, 0.0))
+    max_drawdown = float(np.max(peak - pnl_curve))
 
-        pnl_curve.append(running_pnl)
-        if running_pnl > peak:
-            peak = running_pnl
-        drawdown = peak - running_pnl
-        if drawdown > max_drawdown:
-            max_drawdown = drawdown
-
-    if position:\n        # Mark-to-market exit on last candle
-        close_price = float(candles[-1]["close"])
-        timestamp = candles[-1].get("timestamp")
-        pnl = close_price - position["entry_price"]
-        running_pnl += pnl
-        trades.append(
-            {
-                "entry_time": position["entry_time"],
-                "entry_price": position["entry_price"],
-                "exit_time": timestamp,
-                "exit_price": close_price,
-                "pnl": pnl,
-            }
-        )
-        pnl_curve[-1] = running_pnl
-        if running_pnl > peak:
-            peak = running_pnl
-        drawdown = peak - running_pnl
-        if drawdown > max_drawdown:
-            max_drawdown = drawdown
+    trades: List[Dict[str, Any]] = [
+        {
+            "entry_time": int(timestamps[entry]),
+            "entry_price": float(closes[entry]),
+            "exit_time": int(timestamps[exit_]),
+            "exit_price": float(closes[exit_]),
+            "pnl": float(pnl),
+        }
+        for entry, exit_, pnl in zip(entries, exits, pnls)
+    ]
 
     trade_count = len(trades)
-    wins = sum(1 for trade in trades if trade["pnl"] > 0)
+    wins = int(np.count_nonzero(pnls > 0))
     winrate = wins / trade_count if trade_count else 0.0
 
     summary = {
-        "total_return": running_pnl,
+        "total_return": float(pnl_curve[-1]),
         "winrate": winrate,
         "max_drawdown": max_drawdown,
         "trade_count": trade_count,
@@ -96,6 +81,6 @@ def run_strategy(candles: List[Dict[str, Any]]) -> Dict[str, Any]:
 
     return {
         "trades": trades,
-        "pnl_curve": pnl_curve,
+        "pnl_curve": pnl_curve.tolist(),
         "summary": summary,
     }
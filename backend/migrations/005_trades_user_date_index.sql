@@ -0,0 +1,5 @@
+-- Composite index for per-user trade listings ordered by date
+-- Lets get_user_trades and date-filtered queries use an index range scan
+-- instead of scanning on user_id and sorting afterwards
+
+CREATE INDEX IF NOT EXISTS ix_trades_user_date ON trades(user_id, date);
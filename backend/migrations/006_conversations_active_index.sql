@@ -0,0 +1,6 @@
+-- Partial index for listing a user's live (not soft-deleted) conversations
+-- newest first; matches SupabaseClient.list_conversations' filter and order
+
+CREATE INDEX IF NOT EXISTS ix_conversations_user_active
+    ON conversations(user_id, created_at DESC)
+    WHERE deleted_at IS NULL;
@@ -0,0 +1,9 @@
+-- Replace ix_trades_user_date (005) with an index in get_user_trades' keyset
+-- order: ORDER BY date DESC NULLS LAST, id DESC. The (user_id, date) index
+-- could not serve that order (a backward scan yields NULLS FIRST and has no
+-- id tiebreaker), so every page sorted all of the user's trades first
+
+CREATE INDEX IF NOT EXISTS ix_trades_user_date_id
+    ON trades(user_id, date DESC NULLS LAST, id DESC);
+
+DROP INDEX IF EXISTS ix_trades_user_date;